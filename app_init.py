@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 스트림릿은 요청마다 스크립트를 다시 실행하지만 import 된 모듈은 프로세스에 한 번만 올라온다.
+# 그래서 폰트 등록, plotnine import, 테마 생성처럼 무거운 초기화는 여기서 한 번만 한다.
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "font", "NanumGothic-Bold.ttf")
+FONT_FAMILY = "NanumGothic"
+
+_lock = threading.Lock()
+_theme = None
+_warm_up_started = False
+
+# 초기화 단계별 소요 시간(ms)
+startup_timings = {}
+
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        startup_timings[name] = round(elapsed_ms, 1)
+        logger.info("startup %s: %.1f ms", name, elapsed_ms)
+
+
+def _init_matplotlib() -> None:
+    with _timed("matplotlib_import"):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from matplotlib import font_manager
+
+    # 1. (GitHub Actions 등 리눅스 환경) apt-get install fonts-nanum
+    # 2. Python 코드에서 폰트 설정:
+    with _timed("font_register"):
+        font_manager.fontManager.addfont(FONT_PATH)
+        plt.rcParams['font.family'] = FONT_FAMILY
+        plt.rcParams['axes.unicode_minus'] = False
+
+
+def chart_theme():
+    # 처음 그래프를 그릴 때 matplotlib/plotnine 을 올리고 공용 테마를 만든다
+    global _theme
+    if _theme is None:
+        with _lock:
+            if _theme is None:
+                _init_matplotlib()
+                with _timed("plotnine_import"):
+                    from plotnine import theme_minimal, theme, element_text
+                with _timed("theme_build"):
+                    _theme = (
+                        theme_minimal()
+                        + theme(figure_size=(10, 6),
+                                text=element_text(family=FONT_FAMILY, size=20))
+                    )
+    return _theme
+
+
+def warm_up_in_background() -> None:
+    # 첫 화면은 바로 띄우고, 첫 그래프 요청 전에 백그라운드에서 미리 초기화해 둔다
+    global _warm_up_started
+    with _lock:
+        if _warm_up_started or _theme is not None:
+            return
+        _warm_up_started = True
+    threading.Thread(target=chart_theme, name="chart-warm-up", daemon=True).start()
@@ -0,0 +1,227 @@
+"""그래프 파이프라인 벤치마크.
+
+data/penguins_data.xlsx 와 같은 스키마의 가상 데이터를 행 수/범주 개수별로 만들고,
+그래프 종류마다 단계별 시간을 잰다.
+
+    python benchmark.py --rows 1000,100000,1000000 --cardinality 3,100 --out bench_results.jsonl
+
+단계:
+    load       엑셀 바이트 -> DataFrame (read_sheet). 엑셀 한도 때문에 --load-max-rows 이하만 잰다
+    compact    dtype 축소 (compact_frame, --compact 일 때만)
+    profile    컬럼 프로파일 (build_profile)
+    filter     FilterEngine 인코딩 + 필터 하나 적용
+    aggregate  그래프별 축소 단계만 따로 (구간 집계, 요약, 선 축소 등)
+    build      build_plot (막대그래프 집계는 캐시를 쓰고, 나머지는 축소 단계를 포함)
+    draw       plot.draw() (matplotlib figure 생성)
+    encode     PNG 인코딩 (savefig)
+
+결과는 실행 정보와 함께 한 줄에 한 건씩 JSON 으로 추가 기록한다 (--out).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from chart_data import box_summary_table, density_table, histogram_table
+from charts import AGG_METHODS, SCATTER_DENSITY_ROWS, bar_table, build_plot, line_table, make_spec
+from column_profile import build_profile, discrete_columns
+from dtype_compact import compact_frame
+from filter_engine import FilterEngine
+
+SPECIES = ["Adelie", "Chinstrap", "Gentoo"]
+ISLANDS = ["Biscoe", "Dream", "Torgersen"]
+
+# 측정할 그래프 분기 (이름, make_spec 인자)
+CASES = {
+    "histogram": ("히스토그램", "부리길이(mm)", "사용안함", dict(group_col="펭귄 종", bins=30)),
+    "scatter": ("산점도", "부리길이(mm)", "체중(g)", dict(color_col="펭귄 종")),
+    "bar_count": ("막대그래프", "섬", "개수", dict(group_col="성별")),
+    "bar_mean": ("막대그래프", "섬", "체중(g)", dict(group_col="펭귄 종", agg_method="평균")),
+    "boxplot": ("상자그림", "섬", "체중(g)", dict(group_col="성별")),
+    "line_xy": ("선그래프", "부리길이(mm)", "체중(g)", dict(color_col="펭귄 종")),
+    "line_index": ("선그래프", "사용안함", "날개길이(mm)", dict()),
+}
+
+
+def _labels(base: list, cardinality: int) -> list:
+    if cardinality <= len(base):
+        return base[:cardinality]
+    return base + [f"{base[0]}_{i}" for i in range(len(base), cardinality)]
+
+
+def make_dataset(n_rows: int, cardinality: int, seed: int = 0) -> pd.DataFrame:
+    # 펭귄 데이터와 같은 컬럼/타입. 범주형 두 개(종, 섬)의 값 종류를 cardinality 로 늘린다
+    rng = np.random.default_rng(seed)
+    species = np.array(_labels(SPECIES, cardinality), dtype=object)[rng.integers(0, cardinality, n_rows)]
+    islands = np.array(_labels(ISLANDS, cardinality), dtype=object)[rng.integers(0, cardinality, n_rows)]
+    sex = np.array(["MALE", "FEMALE", None], dtype=object)[rng.choice(3, n_rows, p=[0.49, 0.49, 0.02])]
+    bill_length = rng.normal(44, 5.5, n_rows).round(1)
+    bill_depth = rng.normal(17, 2, n_rows).round(1)
+    # 결측치 약 1%
+    bill_length[rng.random(n_rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        "펭귄 종": pd.array(species, dtype="str"),
+        "섬": pd.array(islands, dtype="str"),
+        "부리길이(mm)": bill_length,
+        "부리깊이(mm)": bill_depth,
+        "날개길이(mm)": rng.normal(200, 14, n_rows).astype(np.int64),
+        "체중(g)": rng.normal(4200, 800, n_rows).astype(np.int64),
+        "성별": pd.array(sex, dtype="str"),
+    })
+
+
+def to_xlsx(df: pd.DataFrame) -> bytes:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("penguins")
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+@contextmanager
+def _timed(ms: dict, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms[stage] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _reduce(df: pd.DataFrame, spec, dataset_key: str):
+    # build_plot 안에서 일어나는 축소 단계만 따로 실행 (막대그래프 집계는 캐시에 넣어 build 에서 재사용)
+    if spec.graph_type == "히스토그램":
+        return histogram_table(df, spec.x_col, spec.bins, spec.group_col)
+    if spec.graph_type == "산점도":
+        if len(df) > SCATTER_DENSITY_ROWS:
+            return density_table(df, spec.x_col, spec.y_col, spec.color_col)
+        return None
+    if spec.graph_type == "막대그래프":
+        return None if spec.y_col == "개수" else bar_table(df, spec, AGG_METHODS[spec.agg_method], dataset_key)
+    if spec.graph_type == "상자그림":
+        return box_summary_table(df, spec.x_col, spec.y_col, spec.group_col)
+    return line_table(df, spec)
+
+
+def bench_case(df: pd.DataFrame, case: str, dataset_key: str, dpi: int) -> dict:
+    from renderer import managed_figure
+
+    graph_type, x_col, y_col, options = CASES[case]
+    spec = make_spec(graph_type, x_col, y_col, **options)
+    ms = {}
+    with _timed(ms, "aggregate"):
+        _reduce(df, spec, dataset_key)
+    with _timed(ms, "build"):
+        plot = build_plot(df, spec, dataset_key)
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    with managed_figure(plot) as fig:
+        ms["draw"] = round((time.perf_counter() - start) * 1000, 2)
+        with _timed(ms, "encode"):
+            fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    return dict(ms, png_bytes=buffer.tell())
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _int_list(text: str) -> list:
+    return [int(float(v)) for v in text.split(",") if v]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="그래프 파이프라인 단계별 벤치마크")
+    parser.add_argument("--rows", type=_int_list, default=_int_list("1e3,1e4,1e5,1e6,1e7"), help="행 수 목록")
+    parser.add_argument("--cardinality", type=_int_list, default=[3, 100], help="범주형 값 종류 수 목록")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"그래프 분기 ({','.join(CASES)})")
+    parser.add_argument("--repeat", type=int, default=1, help="반복 횟수 (단계별 최솟값을 기록)")
+    parser.add_argument("--load-max-rows", type=int, default=100_000, help="load 단계를 잴 최대 행 수")
+    parser.add_argument("--compact", action="store_true", help="로드 후 dtype 축소를 적용")
+    parser.add_argument("--dpi", type=int, default=None, help="PNG 해상도 (기본: RENDER_DPI)")
+    parser.add_argument("--out", default="bench_results.jsonl", help="결과 파일 (JSON Lines, 이어쓰기)")
+    args = parser.parse_args(argv)
+
+    from app_init import chart_theme
+    from excel_loader import read_sheet
+    from renderer import RENDER_DPI
+
+    cases = [c for c in args.cases.split(",") if c]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"알 수 없는 분기: {', '.join(sorted(unknown))}")
+    dpi = args.dpi or RENDER_DPI
+    chart_theme()
+    # 결측치 제거 안내 등 plotnine 경고는 결과 출력만 어지럽힌다
+    warnings.filterwarnings("ignore", module="plotnine")
+
+    run_info = {
+        "run_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "dpi": dpi,
+        "compact_dtypes": args.compact,
+    }
+    with open(args.out, "a", encoding="utf-8") as out:
+        for n_rows in args.rows:
+            for cardinality in args.cardinality:
+                df = make_dataset(n_rows, cardinality)
+                dataset_ms = {}
+                if n_rows <= args.load_max_rows:
+                    data = to_xlsx(df)
+                    with _timed(dataset_ms, "load"):
+                        read_sheet(data)
+                if args.compact:
+                    with _timed(dataset_ms, "compact"):
+                        df, _ = compact_frame(df)
+                with _timed(dataset_ms, "profile"):
+                    profile = build_profile(df)
+                islands = profile["섬"].labels
+                with _timed(dataset_ms, "filter"):
+                    filters = FilterEngine(df, discrete_columns(profile))
+                    filtered = filters.apply({"섬": islands[:-1] if len(islands) > 1 else islands})
+
+                for case in cases:
+                    runs = [
+                        bench_case(filtered, case, f"bench-{n_rows}-{cardinality}-{i}", dpi)
+                        for i in range(args.repeat)
+                    ]
+                    stages = {k: min(r[k] for r in runs) for k in runs[0]}
+                    record = dict(
+                        run_info, case=case, rows=n_rows, cardinality=cardinality,
+                        filtered_rows=len(filtered), **dataset_ms, **stages,
+                    )
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    print(
+                        f"{case:<11} rows={n_rows:>10,} card={cardinality:>5} "
+                        + " ".join(f"{k}={v}" for k, v in stages.items())
+                    )
+                del df, filtered, filters
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
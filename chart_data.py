@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+
+# 그래프에 넘기기 전에 원본 행을 작은 집계 테이블로 줄이는 함수들.
+# plotnine 의 stat 단계를 대신하므로 그리는 시간이 행 수와 무관해진다.
+
+
+def _group_codes(df: pd.DataFrame, group_col):
+    if group_col is None:
+        return np.zeros(len(df), dtype=np.intp), None
+    codes, levels = pd.factorize(df[group_col], sort=True, use_na_sentinel=False)
+    return codes, levels
+
+
+def histogram_table(df: pd.DataFrame, x_col, bins: int, group_col=None):
+    # plotnine stat_bin 과 같은 구간(breaks_from_bins, 오른쪽 닫힘)으로 빈도를 센다
+    from plotnine.stats.binning import breaks_from_bins
+
+    x = df[x_col].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(x)
+    if not valid.any():
+        return None, None
+    codes, levels = _group_codes(df, group_col)
+    x, codes = x[valid], codes[valid]
+
+    breaks = breaks_from_bins((x.min(), x.max()), bins)
+    n_bins = len(breaks) - 1
+    bin_idx = np.searchsorted(breaks, x, side="left") - 1
+    np.clip(bin_idx, 0, n_bins - 1, out=bin_idx)  # 최솟값은 첫 구간에 포함 (include_lowest)
+
+    n_groups = 1 if levels is None else len(levels)
+    counts = np.bincount(codes * n_bins + bin_idx, minlength=n_groups * n_bins)
+    centers = (breaks[:-1] + breaks[1:]) / 2
+
+    table = pd.DataFrame({x_col: np.tile(centers, n_groups), "count": counts})
+    if levels is not None:
+        table[group_col] = levels.take(np.repeat(np.arange(n_groups), n_bins))
+    return table, breaks[1] - breaks[0]
+
+
+def _grid_index(values: np.ndarray, n_cells: int):
+    lo, hi = values.min(), values.max()
+    width = (hi - lo) / n_cells if hi > lo else 1.0
+    idx = ((values - lo) / width).astype(np.intp)
+    np.clip(idx, 0, n_cells - 1, out=idx)
+    return idx, lo + (np.arange(n_cells) + 0.5) * width, width
+
+
+def density_table(df: pd.DataFrame, x_col, y_col, color_col=None, grid=(160, 96)):
+    # 산점도용 2D 구간 집계. 점이 있는 칸만 남기고, 색상 변수가 있으면 칸마다 가장 많은 값을 쓴다
+    x = df[x_col].to_numpy(dtype=float, na_value=np.nan)
+    y = df[y_col].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.any():
+        return None, None
+    codes, levels = _group_codes(df, color_col)
+    x, y, codes = x[valid], y[valid], codes[valid]
+
+    nx, ny = grid
+    ix, x_centers, x_width = _grid_index(x, nx)
+    iy, y_centers, y_width = _grid_index(y, ny)
+    cell = ix * ny + iy
+
+    totals = np.bincount(cell, minlength=nx * ny)
+    occupied = np.flatnonzero(totals)
+    table = pd.DataFrame({
+        x_col: x_centers[occupied // ny],
+        y_col: y_centers[occupied % ny],
+        "count": totals[occupied],
+    })
+    if levels is not None:
+        table[color_col] = levels.take(_dominant_codes(cell, codes, len(levels), occupied))
+    return table, (x_width, y_width)
+
+
+def _dominant_codes(cell: np.ndarray, codes: np.ndarray, n_levels: int, occupied: np.ndarray):
+    # 칸마다 가장 많이 나온 코드. 값 종류가 적으면 (값 x 칸) 빈도표로, 많으면 정렬로 구한다
+    n_cells = int(cell.max()) + 1
+    if n_levels * n_cells <= 5_000_000:
+        counts = np.bincount(codes * n_cells + cell, minlength=n_levels * n_cells)
+        return counts.reshape(n_levels, n_cells)[:, occupied].argmax(axis=0)
+    pairs = pd.DataFrame({"cell": cell, "code": codes}).value_counts(sort=True)
+    best = pairs.reset_index().drop_duplicates("cell").set_index("cell")["code"]
+    return best.reindex(occupied).to_numpy()
+
+
+def decimate_lines(df: pd.DataFrame, x_col, y_col, group_col=None, max_points: int = 2000):
+    # 선그래프용 min/max(M4) 구간 축소: 그룹별로 x 를 max_points/4 개 구간으로 나누고
+    # 각 구간의 첫 점, 마지막 점, 최솟값, 최댓값만 남긴다. 봉우리/골짜기는 그대로 보존된다.
+    if len(df) <= max_points:
+        return df
+    x = df[x_col].to_numpy(dtype=float, na_value=np.nan)
+    y = df[y_col].to_numpy(dtype=float, na_value=np.nan)
+    codes, _ = _group_codes(df, group_col)
+
+    rows = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    if len(rows) <= max_points:
+        return df
+    # geom_line 과 같이 그룹 안에서 x 순으로 정렬 (lexsort 는 안정 정렬)
+    rows = rows[np.lexsort((x[rows], codes[rows]))]
+    x, y, codes = x[rows], y[rows], codes[rows]
+
+    n_buckets = max(max_points // 4, 1)
+    lo, hi = x.min(), x.max()
+    width = (hi - lo) / n_buckets if hi > lo else 1.0
+    bucket = np.clip(((x - lo) / width).astype(np.intp), 0, n_buckets - 1)
+    segment_key = codes.astype(np.int64) * n_buckets + bucket
+
+    starts = np.r_[0, np.flatnonzero(np.diff(segment_key)) + 1]
+    ends = np.r_[starts[1:], len(x)] - 1
+    segment = np.repeat(np.arange(len(starts)), ends - starts + 1)
+
+    # 구간별 최솟값/최댓값이 처음 나오는 위치
+    seg_min = np.minimum.reduceat(y, starts)
+    seg_max = np.maximum.reduceat(y, starts)
+    min_pos = np.flatnonzero(y == seg_min[segment])
+    max_pos = np.flatnonzero(y == seg_max[segment])
+    min_pos = min_pos[np.unique(segment[min_pos], return_index=True)[1]]
+    max_pos = max_pos[np.unique(segment[max_pos], return_index=True)[1]]
+
+    keep = np.unique(np.concatenate([starts, ends, min_pos, max_pos]))
+    return df.iloc[np.sort(rows[keep])]
+
+
+def box_summary_table(df: pd.DataFrame, x_col, y_col, group_col=None, coef: float = 1.5):
+    # 상자그림용 다섯 숫자 요약 + 이상치 목록. plotnine stat_boxplot 과 같은 규칙(np.percentile, 1.5 IQR)
+    keys = [x_col, group_col] if group_col else [x_col]
+    data = df[keys + [y_col]].dropna()
+    if data.empty:
+        return None
+    grouped = data.groupby(keys, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    y = data[y_col].to_numpy(dtype=float)
+
+    # 사분위수는 float 값을 그룹 번호로 묶어 계산 (작은 정수형 컬럼을 그대로 쓰면 내부 변환이 느리다)
+    quartiles = pd.Series(y).groupby(codes, sort=True).quantile([0.25, 0.5, 0.75]).unstack()
+    q1, med, q3 = (quartiles[q].to_numpy() for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+
+    # 수염: 울타리(q1 - coef*iqr, q3 + coef*iqr) 안쪽의 가장 바깥 값
+    n_groups = len(quartiles)
+    inside_lo = y >= (q1 - coef * iqr)[codes]
+    inside_hi = y <= (q3 + coef * iqr)[codes]
+    lo = np.full(n_groups, np.inf)
+    hi = np.full(n_groups, -np.inf)
+    np.minimum.at(lo, codes[inside_lo], y[inside_lo])
+    np.maximum.at(hi, codes[inside_hi], y[inside_hi])
+    whislo = np.where(lo > q1, q1, lo)
+    whishi = np.where(hi < q3, q3, hi)
+
+    outlier_rows = (y < whislo[codes]) | (y > whishi[codes])
+    outlier_codes = codes[outlier_rows]
+    order = np.argsort(outlier_codes, kind="stable")
+    outliers = np.split(
+        y[outlier_rows][order],
+        np.searchsorted(outlier_codes[order], np.arange(1, n_groups)),
+    )
+
+    # size() 의 순서가 ngroup() 번호와 같다
+    summary = grouped.size().index.to_frame(index=False)
+    summary["ymin"] = whislo
+    summary["lower"] = q1
+    summary["middle"] = med
+    summary["upper"] = q3
+    summary["ymax"] = whishi
+    summary["outliers"] = outliers
+    return summary
+
+
+# 막대그래프 집계에서 한 번에 계산하는 통계량
+AGG_STATS = ["count", "sum", "mean", "median", "std", "min", "max"]
+
+
+def aggregate_table(df: pd.DataFrame, x_col, y_col, group_col=None) -> pd.DataFrame:
+    # 그룹 키 계산(factorize)은 한 번만 하고 모든 통계량을 같이 구한다.
+    # observed=True: 범주형 키일 때 실제로 있는 조합만 남긴다
+    keys = [x_col, group_col] if group_col else [x_col]
+    grouped = df.groupby(keys, observed=True, sort=True)[y_col]
+    return grouped.agg(AGG_STATS).reset_index()
+
+
+def stratified_sample(df: pd.DataFrame, strata=(), n_rows: int = 10000, seed: int = 0) -> pd.DataFrame:
+    # 층(strata 컬럼 값 조합)마다 같은 비율로 뽑아 그룹/색상 비율을 유지한다.
+    # 작은 층도 최소 1행은 남겨 범례가 바뀌지 않게 하고, 원래 행 순서를 유지한다
+    if len(df) <= n_rows:
+        return df
+    codes = np.zeros(len(df), dtype=np.intp)
+    for col in strata:
+        col_codes, levels = _group_codes(df, col)
+        codes = codes * len(levels) + col_codes
+    codes, _ = pd.factorize(codes)
+
+    # 층별로 모으고 층 안에서는 무작위 순서 (정수 코드 + [0, 1) 난수를 한 번에 정렬)
+    rng = np.random.default_rng(seed)
+    order = np.argsort(codes + rng.random(len(df)))
+    counts = np.bincount(codes)
+    take = np.maximum(np.rint(counts * (n_rows / len(df))), 1).astype(np.intp)
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(df)) - np.repeat(starts, counts)
+    chosen = np.sort(order[rank < np.repeat(take, counts)])
+    return df.iloc[chosen]
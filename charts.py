@@ -0,0 +1,347 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+from app_init import chart_theme
+from chart_data import (
+    aggregate_table, box_summary_table, decimate_lines, density_table, histogram_table,
+    stratified_sample
+)
+from column_profile import is_continuous
+import render_pool
+from data_cache import FrameCache, LRUCache
+from metrics import stage
+from renderer import render_png
+
+GRAPH_TYPES = ["선택안함", "히스토그램", "산점도", "막대그래프", "상자그림", "선그래프"]
+NOT_USED = "사용안함"
+NO_GROUP = "없음"
+COUNT = "개수"
+
+# 결과 그래프를 그리는 방식: 서버에서 PNG 로 그리거나(plotnine), 브라우저에서 그린다(plotly/WebGL)
+CHART_BACKENDS = ["plotnine (이미지)", "plotly (인터랙티브)"]
+
+# 막대그래프 집계 방식 -> chart_data.aggregate_table 의 통계량 컬럼
+AGG_METHODS = {
+    "합계": "sum",
+    "평균": "mean",
+    "개수": "count",
+    "중앙값": "median",
+    "표준편차": "std",
+    "최솟값": "min",
+    "최댓값": "max",
+}
+
+# 이 행 수를 넘는 산점도는 점 대신 2D 밀도(구간 집계)로 그린다. 환경변수 SCATTER_DENSITY_ROWS 로 조정
+SCATTER_DENSITY_ROWS = int(os.environ.get("SCATTER_DENSITY_ROWS", "200000"))
+
+# 선그래프의 계열(색상 그룹)당 최대 점 수. 그림 폭(10인치 x 200dpi)의 픽셀 수 정도면 모양이 유지된다
+LINE_MAX_POINTS = int(os.environ.get("LINE_MAX_POINTS", "2000"))
+
+# 진행형 렌더링: 필터 결과가 이 행 수보다 많으면 층화 표본으로 미리보기를 먼저 그린다
+PREVIEW_ROWS = int(os.environ.get("PREVIEW_ROWS", "10000"))
+
+# 렌더링된 PNG 캐시 예산 (MB). 환경변수 CHART_CACHE_MB 로 조정
+DEFAULT_CHART_CACHE_MB = int(os.environ.get("CHART_CACHE_MB", "128"))
+
+# (데이터셋 해시, x, 그룹, y, 필터) -> 집계 테이블. 집계 방식을 바꿀 때는 다시 계산하지 않는다
+aggregate_cache = FrameCache(32 * 1024 * 1024)
+
+
+class ChartError(ValueError):
+    """선택한 축/옵션 조합으로는 그래프를 그릴 수 없을 때 (메시지는 화면에 그대로 표시)."""
+
+
+@dataclass(frozen=True)
+class PlotSpec:
+    graph_type: str
+    x_col: str = None
+    y_col: str = None
+    group_col: str = None
+    color_col: str = None
+    bins: int = None
+    agg_method: str = None
+    # ((컬럼, (선택값, ...)), ...) 정렬된 튜플
+    filters: tuple = ()
+    box_fill: str = "steelblue"
+
+    def key(self) -> str:
+        payload = json.dumps(asdict(self), ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _optional(value):
+    return None if value in (None, NOT_USED, NO_GROUP) else value
+
+
+def filter_key(selections) -> tuple:
+    # {컬럼: 선택값 목록} -> spec 에 넣을 정렬된 튜플
+    return tuple(sorted(
+        (col, tuple(sorted(map(str, selected))))
+        for col, selected in (selections or {}).items()
+    ))
+
+
+def make_spec(graph_type, x_col, y_col, group_col=None, color_col=None, bins=None,
+              agg_method=None, selections=None, box_fill="steelblue") -> PlotSpec:
+    # 화면의 선택값을 정규화: '사용안함'/'없음' 은 None, 해당 그래프에서 안 쓰는 옵션은 버린다
+    uses_group = graph_type in ("히스토그램", "막대그래프", "상자그림")
+    uses_color = graph_type in ("산점도", "선그래프")
+    return PlotSpec(
+        graph_type=graph_type,
+        x_col=_optional(x_col),
+        y_col=_optional(y_col),
+        group_col=_optional(group_col) if uses_group else None,
+        color_col=_optional(color_col) if uses_color else None,
+        bins=int(bins) if graph_type == "히스토그램" and bins else None,
+        agg_method=agg_method if graph_type == "막대그래프" else None,
+        filters=filter_key(selections),
+        box_fill=box_fill,
+    )
+
+
+def _scatter_density(df, x_col, y_col, color_col):
+    from plotnine import ggplot, aes, geom_tile, scale_fill_continuous
+
+    # 대용량 모드: 칸 수가 고정이라 행 수와 관계없이 그리는 시간과 PNG 크기가 일정하다
+    with stage("aggregate", rows_in=len(df)) as record:
+        cells, cell_size = density_table(df, x_col, y_col, color_col)
+        record["rows_out"] = None if cells is None else len(cells)
+    if cells is None:
+        return None
+    cell_w, cell_h = cell_size
+    if color_col:
+        return (
+            ggplot(cells, aes(x=x_col, y=y_col, fill=color_col))
+            + geom_tile(width=cell_w, height=cell_h, alpha=0.8)
+            + chart_theme()
+        )
+    return (
+        ggplot(cells, aes(x=x_col, y=y_col, fill="count"))
+        + geom_tile(width=cell_w, height=cell_h)
+        + scale_fill_continuous(trans="log10")
+        + chart_theme()
+    )
+
+
+def check_spec(df: pd.DataFrame, spec: PlotSpec) -> None:
+    # 그래프를 그리기 위한 타입 체크. 백엔드(plotnine/plotly)와 관계없이 같은 규칙을 쓴다
+    x_col, y_col = spec.x_col, spec.y_col
+    x_is_cont = x_col is not None and is_continuous(df[x_col])
+    y_is_cont = y_col not in (None, COUNT) and is_continuous(df[y_col])
+
+    if spec.graph_type == "히스토그램":
+        if x_col is None or not x_is_cont:
+            raise ChartError("히스토그램은 X축에 연속형 변수가 필요합니다.")
+    elif spec.graph_type == "산점도":
+        if not (x_is_cont and y_is_cont):
+            raise ChartError("산점도는 X, Y 모두 연속형 변수가 필요합니다.")
+    elif spec.graph_type == "막대그래프":
+        # x = 이산형, y = '개수' 또는 연속형
+        if x_col is None or x_is_cont:
+            raise ChartError("막대그래프는 X축이 이산형이어야 합니다.")
+        if y_col != COUNT and not y_is_cont:
+            raise ChartError("막대그래프에서 Y축은 '개수' 또는 연속형 변수가 필요합니다.")
+    elif spec.graph_type == "상자그림":
+        # x 이산형, y 연속형
+        if x_col is None or x_is_cont or not y_is_cont:
+            raise ChartError("상자그림은 X=이산형, Y=연속형 변수가 필요합니다.")
+    elif spec.graph_type == "선그래프":
+        # (1) x_col 선택 & x,y 모두 연속형 => 일반 라인
+        # (2) x_col == "사용안함" & y_col 연속형 => 인덱스 vs y_col
+        if x_col is not None:
+            if not (x_is_cont and y_is_cont):
+                raise ChartError("선그래프(일반)는 x,y 모두 연속형일 때 사용하세요.")
+        elif not y_is_cont:
+            raise ChartError("선그래프: x='사용안함'일 때는 Y축이 연속형 변수여야 합니다. (인덱스 vs y_col)")
+    else:
+        raise ChartError("그래프 종류를 선택해주세요.")
+
+
+def bar_table(df: pd.DataFrame, spec: PlotSpec, stat: str, dataset_key: str = None) -> pd.DataFrame:
+    # 막대그래프 집계 테이블 [x, (그룹), y]. dataset_key 가 있으면 데이터셋 단위로 캐시한다
+    x_col, y_col, group_col = spec.x_col, spec.y_col, spec.group_col
+    with stage("aggregate", rows_in=len(df)) as record:
+        if dataset_key is None:
+            stats = aggregate_table(df, x_col, y_col, group_col)
+        else:
+            stats = aggregate_cache.get_or_load(
+                (dataset_key, x_col, group_col, y_col, spec.filters),
+                lambda: aggregate_table(df, x_col, y_col, group_col),
+            )
+        record["rows_out"] = len(stats)
+    keys = [x_col, group_col] if group_col else [x_col]
+    # 컬럼 이름이 문자열이 아닐 수 있어 assign 대신 열을 직접 넣는다 (stats[keys] 는 새 DataFrame)
+    table = stats[keys]
+    table[y_col] = stats[stat]
+    return table
+
+
+def build_plot(df: pd.DataFrame, spec: PlotSpec, dataset_key: str = None):
+    # dataset_key 가 있으면 중간 집계 결과를 데이터셋 단위로 캐시한다
+    check_spec(df, spec)
+    # plotnine 은 처음 그래프를 그릴 때 올린다 (chart_theme 이 폰트/테마 초기화를 한 번만 한다)
+    chart_theme()
+    from plotnine import (
+        ggplot, aes, geom_histogram, geom_point, geom_bar,
+        geom_boxplot, geom_col, geom_line, labs
+    )
+
+    x_col, y_col = spec.x_col, spec.y_col
+    group_col, color_col = spec.group_col, spec.color_col
+
+    if spec.graph_type == "히스토그램":
+        # 빠른 경로: numpy 로 미리 구간별 빈도를 세고 작은 테이블만 geom_col 로 그린다
+        binned = bin_width = None
+        if "count" not in (x_col, group_col):
+            with stage("aggregate", rows_in=len(df)) as record:
+                binned, bin_width = histogram_table(df, x_col, spec.bins or 30, group_col)
+                record["rows_out"] = None if binned is None else len(binned)
+        if binned is not None:
+            if group_col:
+                return (
+                    ggplot(binned, aes(x=x_col, y="count", fill=group_col))
+                    + geom_col(width=bin_width, color="white", alpha=0.5, position="identity")
+                    + chart_theme()
+                )
+            return (
+                ggplot(binned, aes(x=x_col, y="count"))
+                + geom_col(width=bin_width, fill="steelblue", color="white")
+                + chart_theme()
+            )
+        if group_col:
+            return (
+                ggplot(df, aes(x=x_col, fill=group_col))
+                + geom_histogram(
+                    bins=spec.bins,
+                    color="white",
+                    alpha=0.5,
+                    position="identity"
+                )
+                + chart_theme()
+            )
+        return (
+            ggplot(df, aes(x=x_col))
+            + geom_histogram(bins=spec.bins, fill="steelblue", color="white")
+            + chart_theme()
+        )
+
+    if spec.graph_type == "산점도":
+        if len(df) > SCATTER_DENSITY_ROWS and "count" not in (x_col, y_col, color_col):
+            density_plot = _scatter_density(df, x_col, y_col, color_col)
+            if density_plot is not None:
+                return density_plot
+        if color_col:
+            return ggplot(df, aes(x=x_col, y=y_col, color=color_col)) + geom_point() + chart_theme()
+        return ggplot(df, aes(x=x_col, y=y_col)) + geom_point(color="steelblue") + chart_theme()
+
+    if spec.graph_type == "막대그래프":
+        # (1) y_col = '개수' => geom_bar
+        if y_col == COUNT:
+            if group_col:
+                return ggplot(df, aes(x=x_col, fill=group_col)) + geom_bar(position="dodge") + chart_theme()
+            return ggplot(df, aes(x=x_col)) + geom_bar(fill="steelblue") + chart_theme()
+        # (2) y_col = 연속형 => geom_col
+        if spec.agg_method in AGG_METHODS:
+            df = bar_table(df, spec, AGG_METHODS[spec.agg_method], dataset_key)
+        # agg_method 미선택 => row별 그대로 geom_col
+        if group_col:
+            return ggplot(df, aes(x=x_col, y=y_col, fill=group_col)) + geom_col(position="dodge") + chart_theme()
+        return ggplot(df, aes(x=x_col, y=y_col)) + geom_col(fill="steelblue") + chart_theme()
+
+    if spec.graph_type == "상자그림":
+        # 그룹별 요약(사분위수, 수염, 이상치)을 한 번에 계산하고 요약 테이블만 그린다
+        with stage("aggregate", rows_in=len(df)) as record:
+            summary = box_summary_table(df, x_col, y_col, group_col)
+            record["rows_out"] = None if summary is None else len(summary)
+        if summary is None:
+            raise ChartError("상자그림을 그릴 데이터가 없습니다.")
+        box_aes = aes(
+            x=x_col, ymin="ymin", lower="lower", middle="middle",
+            upper="upper", ymax="ymax", outliers="outliers",
+        )
+        # 너비 0.75 는 stat_boxplot 의 기본값
+        if group_col:
+            box_aes["fill"] = group_col
+            box = geom_boxplot(stat="identity", width=0.75)
+        elif spec.box_fill:
+            box = geom_boxplot(stat="identity", width=0.75, fill=spec.box_fill)
+        else:
+            box = geom_boxplot(stat="identity", width=0.75)
+        return ggplot(summary, box_aes) + box + labs(y=y_col) + chart_theme()
+
+    if spec.graph_type == "선그래프":
+        line_df, line_x = line_table(df, spec)
+        if color_col:
+            return (
+                ggplot(line_df, aes(x=line_x, y=y_col, color=color_col, group=color_col))
+                + geom_line()
+                + chart_theme()
+            )
+        return ggplot(line_df, aes(x=line_x, y=y_col)) + geom_line(color="steelblue") + chart_theme()
+
+    raise ChartError("그래프 종류를 선택해주세요.")
+
+
+def line_table(df: pd.DataFrame, spec: PlotSpec):
+    # x='사용안함' 이면 인덱스를 x 로 쓰고, 긴 계열은 그리기 전에 그룹별로 줄인다
+    if spec.x_col is not None:
+        line_df, line_x = df, spec.x_col
+    else:
+        line_df, line_x = df.reset_index(drop=False).rename(columns={"index": "IDX"}), "IDX"
+    with stage("aggregate", rows_in=len(df)) as record:
+        line_df = decimate_lines(line_df, line_x, spec.y_col, spec.color_col, LINE_MAX_POINTS)
+        record["rows_out"] = len(line_df)
+    return line_df, line_x
+
+
+# (데이터셋 해시, spec 해시) -> PNG 바이트. 같은 화면을 다시 볼 때는 plotnine/matplotlib 을 건너뛴다
+chart_cache = LRUCache(DEFAULT_CHART_CACHE_MB * 1024 * 1024)
+
+
+def spec_columns(spec: PlotSpec) -> list:
+    # 그래프에 실제로 쓰이는 원본 컬럼
+    cols = [spec.x_col, spec.y_col, spec.group_col, spec.color_col]
+    return list(dict.fromkeys(c for c in cols if c not in (None, COUNT)))
+
+
+def _render_chart(dataset_key: str, spec: PlotSpec, df: pd.DataFrame, check=None) -> bytes:
+    # check: 취소 확인 콜백. 인라인이면 집계가 끝나고 그리기 전에, 프로세스 풀이면 기다리는 동안 부른다
+    if render_pool.enabled():
+        # 잘못된 축 조합은 풀 자리/인코딩/왕복 없이 여기서 바로 ChartError (실패 집계에 섞이지 않게)
+        check_spec(df, spec)
+        # 워커 프로세스 안의 단계는 여기서 보이지 않으므로 왕복 전체를 한 단계로 잰다
+        with stage("render_pool", rows_in=len(df)):
+            return render_pool.render(df, spec, spec_columns(spec), check)
+    plot = build_plot(df, spec, dataset_key)
+    if check is not None:
+        check()
+    return render_png(plot)
+
+
+def cached_chart(dataset_key: str, spec: PlotSpec):
+    # 이미 그려 둔 PNG. 없으면 None
+    return chart_cache.get((dataset_key, spec.key()))
+
+
+def cached_chart_png(dataset_key: str, spec: PlotSpec, get_df, check=None) -> bytes:
+    # get_df() 는 캐시 미스일 때만 호출된다
+    return chart_cache.get_or_load(
+        (dataset_key, spec.key()), lambda: _render_chart(dataset_key, spec, get_df(), check)
+    )
+
+
+def preview_chart_png(dataset_key: str, spec: PlotSpec, df: pd.DataFrame) -> bytes:
+    # 그룹/색상 비율을 유지한 층화 표본으로 그린 미리보기 (전체 렌더링이 끝나면 바뀐다)
+    def render():
+        with stage("sample", rows_in=len(df)) as record:
+            strata = [c for c in (spec.group_col, spec.color_col) if c is not None]
+            sample = stratified_sample(df, strata, PREVIEW_ROWS)
+            record["rows_out"] = len(sample)
+        # 표본 집계가 데이터셋 단위 집계 캐시에 들어가지 않도록 dataset_key 없이 그린다
+        return _render_chart(None, spec, sample)
+
+    return chart_cache.get_or_load((dataset_key, spec.key(), "preview"), render)
@@ -0,0 +1,60 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+def is_continuous(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series)
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    dtype: str
+    is_continuous: bool
+    cardinality: int
+    null_count: int
+    min: object = None
+    max: object = None
+    # 이산형 컬럼의 필터 선택지 (str 로 변환해 정렬한 고유값)
+    labels: list = field(default_factory=list)
+
+
+def _scalar(value):
+    # numpy 스칼라는 파이썬 값으로 바꾼다 (dtype 축소로 int8 이 된 컬럼은 max - min 이 넘칠 수 있다)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def profile_column(name, series: pd.Series) -> ColumnProfile:
+    continuous = is_continuous(series)
+    non_null = series.dropna()
+    uniques = pd.unique(non_null)
+
+    col_min = col_max = None
+    if continuous and not pd.api.types.is_bool_dtype(series) and len(non_null) > 0:
+        col_min, col_max = _scalar(non_null.min()), _scalar(non_null.max())
+
+    return ColumnProfile(
+        name=name,
+        dtype=str(series.dtype),
+        is_continuous=continuous,
+        cardinality=len(uniques),
+        null_count=int(len(series) - len(non_null)),
+        min=col_min,
+        max=col_max,
+        labels=[] if continuous else sorted(map(str, uniques)),
+    )
+
+
+def build_profile(df: pd.DataFrame) -> dict:
+    # 데이터 로드 시 한 번만 만들고, 이후 rerun 에서는 원본 df 를 다시 스캔하지 않는다
+    return {col: profile_column(col, df[col]) for col in df.columns}
+
+
+def discrete_columns(profile: dict, exclude=None) -> list:
+    return [name for name, p in profile.items() if not p.is_continuous and name != exclude]
+
+
+def column_is_continuous(profile: dict, col) -> bool:
+    return col in profile and profile[col].is_continuous
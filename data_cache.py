@@ -0,0 +1,533 @@
+import atexit
+import hashlib
+import itertools
+import logging
+import os
+import pickle
+import queue
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import pandas as pd
+
+from column_profile import discrete_columns
+from filter_engine import FilterEngine
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# 캐시 메모리 예산 (MB). 환경변수 DATASET_CACHE_MB 로 조정
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("DATASET_CACHE_MB", "512"))
+
+# 세션 하나가 쓰는 데이터 크기 예산 (MB). 전체 예산을 넘으면 이보다 큰 데이터셋부터 디스크로 내린다
+SESSION_MEMORY_MB = int(os.environ.get("SESSION_MEMORY_MB", "256"))
+# 이 시간(초) 동안 아무 세션도 쓰지 않은 데이터셋은 크기와 관계없이 디스크로 내린다
+SPILL_IDLE_S = float(os.environ.get("SPILL_IDLE_S", "300"))
+# 내린 데이터셋을 둘 폴더 (Parquet, Arrow 로 바꿀 수 없는 데이터는 pickle)
+SPILL_DIR = os.environ.get("SPILL_DIR") or os.path.join(tempfile.gettempdir(), "streamlit_gg_spill")
+
+
+def hash_bytes(data: bytes, **options) -> str:
+    # 업로드 바이트 + 읽기 옵션(시트 등)을 합쳐 데이터셋 키를 만든다
+    h = hashlib.blake2b(data, digest_size=16)
+    for name in sorted(options):
+        h.update(f"|{name}={options[name]!r}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+@dataclass
+class Dataset:
+    key: str
+    df: pd.DataFrame
+    # 컬럼명 -> ColumnProfile (column_profile.build_profile)
+    profile: dict = field(default_factory=dict)
+    # 이산형 컬럼 코드 인코딩 (필터용)
+    filters: FilterEngine = None
+    # 로드 시 dtype 축소 결과 (dtype_compact.compact_frame 의 리포트)
+    memory_report: dict = field(default_factory=dict)
+
+    @cached_property
+    def _frame_nbytes(self) -> int:
+        # 프레임은 바뀌지 않으므로 한 번만 잰다 (deep=True 는 object 컬럼에서 느리다)
+        return frame_nbytes(self.df)
+
+    @property
+    def nbytes(self) -> int:
+        # 필터 엔진의 마스크 캐시는 로드 후에도 커지므로 매번 다시 더한다
+        filter_nbytes = self.filters.nbytes if self.filters is not None else 0
+        return self._frame_nbytes + filter_nbytes
+
+
+@dataclass
+class SpilledDataset:
+    """디스크(Parquet 또는 pickle)로 내린 데이터셋. 프로파일처럼 작은 정보만 메모리에 남긴다."""
+    key: str
+    path: str
+    nbytes: int
+    profile: dict = field(default_factory=dict)
+    memory_report: dict = field(default_factory=dict)
+
+
+class LRUCache:
+    """메모리 예산(바이트) 기준으로 오래 안 쓴 항목부터 제거하는 LRU 캐시."""
+
+    def __init__(self, memory_budget_bytes: int):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self._used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def sizeof(self, value) -> int:
+        return len(value)
+
+    def put(self, key, value) -> None:
+        nbytes = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._used_bytes -= self._entries.pop(key)[1]
+            # 예산보다 큰 데이터는 캐시하지 않는다 (다른 항목을 모두 밀어내지 않도록).
+            # 단, 세션이 쓰고 있는 항목은 공유해야 하므로 예외
+            if nbytes > self.memory_budget_bytes and not self._pinned(key):
+                return
+            self._entries[key] = (value, nbytes)
+            self._used_bytes += nbytes
+            self._evict_over_budget(keep=key)
+
+    def _pinned(self, key) -> bool:
+        return False
+
+    def _evict_over_budget(self, keep=None) -> None:
+        # (lock 을 잡은 상태에서) 오래 안 쓴 것부터 제거하되, 사용 중으로 고정된 항목은 건너뛴다
+        for old_key in list(self._entries):
+            if self._used_bytes <= self.memory_budget_bytes:
+                break
+            if old_key == keep or self._pinned(old_key):
+                continue
+            _, old_nbytes = self._entries.pop(old_key)
+            self._used_bytes -= old_nbytes
+            self.evictions += 1
+            self._on_evict(old_key)
+
+    def _on_evict(self, key) -> None:
+        pass
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._used_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "used_bytes": self._used_bytes,
+                "budget_bytes": self.memory_budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class DatasetCache(LRUCache):
+    """업로드 내용 해시로 키를 잡는 데이터셋 캐시.
+
+    같은 파일을 올린 세션들은 읽기 전용 Dataset 하나를 같이 쓴다. 아무도 안 쓰는 데이터셋은
+    오래된 순서로 제거하고, 세션이 쓰고 있는(참조 수 > 0) 데이터셋은 제거하는 대신 파일(Parquet)로
+    디스크에 내렸다가 다음 get() 에서 다시 올린다. 내리는 경우:
+      - 전체 예산을 넘을 때: 세션 예산(SESSION_MEMORY_MB)을 넘는 데이터셋부터, 그 안에서는 오래 쉰 순서로
+      - 한 세션이 메모리에 둔 데이터셋 합계가 세션 예산을 넘을 때: 그 세션이 가장 최근에 쓴 것만 남기고
+        (데이터셋 하나는 나눌 수 없으므로 그 하나가 세션 예산보다 크면 그대로 둔다)
+      - 쓰는 세션들이 모두 SPILL_IDLE_S 동안 쉬었을 때 (크기와 관계없이)
+    """
+
+    def __init__(self, memory_budget_bytes: int, session_budget_bytes: int = None,
+                 idle_seconds: float = None, spill_dir: str = None):
+        super().__init__(memory_budget_bytes)
+        self.session_budget_bytes = (
+            SESSION_MEMORY_MB * 1024 * 1024 if session_budget_bytes is None else session_budget_bytes
+        )
+        self.idle_seconds = SPILL_IDLE_S if idle_seconds is None else idle_seconds
+        self.spill_dir = spill_dir or SPILL_DIR
+        self._refs = {}  # key -> {owner, ...}
+        self._last_used = {}  # key -> 마지막으로 쓴 시각 (time.monotonic)
+        self._spill_files = {}  # key -> 파일 경로 (데이터가 바뀌지 않으므로 다시 내릴 때 재사용)
+        self._unspillable = set()  # 파일로 쓰지 못한 데이터셋. 다시 시도하지 않고 건너뛴다
+        self._reload_lock = threading.Lock()
+        # 수거된 DatasetLease 의 owner. 파이널라이저는 GC 가 아무 스레드에서나(lock 을 잡은 중에도)
+        # 부를 수 있어 lock 을 잡지 않고 여기에 넣기만 하고, 정리는 다음 acquire/release/spill_idle/stats 에서 한다
+        self._released = queue.SimpleQueue()
+        self._sweeper = None
+        self.spills = 0
+        self.reloads = 0
+
+    def sizeof(self, value) -> int:
+        # 디스크로 내린 데이터셋은 메모리 예산을 쓰지 않는다
+        return 0 if isinstance(value, SpilledDataset) else value.nbytes
+
+    def _pinned(self, key) -> bool:
+        return key in self._refs
+
+    def _on_evict(self, key) -> None:
+        self._last_used.pop(key, None)
+        self._unspillable.discard(key)
+        path = self._spill_files.pop(key, None)
+        if path is not None:
+            _remove_file(path)
+
+    def get(self, key):
+        value = super().get(key)
+        if value is None:
+            return None
+        with self._lock:
+            self._last_used[key] = time.monotonic()
+        if isinstance(value, SpilledDataset):
+            value = self._reload(value)
+        return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._last_used[key] = time.monotonic()
+            self._refresh_nbytes()
+        super().put(key, value)
+        self._spill_over_budget()
+
+    def _refresh_nbytes(self) -> None:
+        # (lock 을 잡은 상태에서) 메모리에 있는 데이터셋 크기를 다시 잰다. 마스크 캐시가 put 이후에 커지기 때문
+        for key, (value, nbytes) in self._entries.items():
+            if isinstance(value, Dataset):
+                current = value.nbytes
+                if current != nbytes:
+                    self._entries[key] = (value, current)
+                    self._used_bytes += current - nbytes
+
+    def _session_usage(self) -> dict:
+        # (lock 을 잡은 상태에서) 세션(owner)별로 메모리에 둔 데이터셋 크기 합계.
+        # 여러 세션이 같이 쓰는 데이터셋은 각 세션에 모두 더한다
+        usage = {}
+        for key, owners in self._refs.items():
+            value, nbytes = self._entries.get(key, (None, 0))
+            if not isinstance(value, Dataset):
+                nbytes = 0
+            for owner in owners:
+                usage[owner] = usage.get(owner, 0) + nbytes
+        return usage
+
+    def _reload(self, spilled: SpilledDataset) -> Dataset:
+        # 여러 세션이 동시에 같은 데이터셋을 올리지 않도록 한 번에 하나씩
+        with self._reload_lock:
+            current = super().get(spilled.key)
+            if isinstance(current, Dataset):
+                return current
+            with stage("reload") as record:
+                if spilled.path.endswith(".pkl"):
+                    df = pd.read_pickle(spilled.path)
+                else:
+                    df = pd.read_parquet(spilled.path, memory_map=True)
+                record["rows_out"] = len(df)
+                dataset = Dataset(
+                    key=spilled.key, df=df, profile=spilled.profile,
+                    filters=FilterEngine(df, discrete_columns(spilled.profile)),
+                    memory_report=spilled.memory_report,
+                )
+            with self._lock:
+                self.reloads += 1
+            super().put(spilled.key, dataset)
+        self._spill_over_budget()
+        return dataset
+
+    def _write_spill(self, key, df: pd.DataFrame):
+        # Parquet 로 쓰고, Arrow 로 바꿀 수 없는 데이터(숫자와 문자가 섞인 object 컬럼 등)는 pickle 로 쓴다.
+        # 둘 다 실패하면 None
+        import pyarrow as pa
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        base = os.path.join(self.spill_dir, key)
+        writers = [
+            (".parquet", df.to_parquet, (pa.ArrowException, ValueError, TypeError, OSError)),
+            (".pkl", df.to_pickle, (pickle.PicklingError, TypeError, AttributeError, OSError)),
+        ]
+        for ext, write, errors in writers:
+            path = base + ext
+            partial = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with stage("spill", rows_in=len(df)):
+                    write(partial)
+            except errors as e:
+                logger.warning("could not spill dataset %s as %s: %s", key, ext, e)
+                _remove_file(partial)
+                continue
+            os.replace(partial, path)
+            _spill_paths.add(path)
+            return path
+        return None
+
+    def spill(self, key) -> bool:
+        # 메모리에 있는 데이터셋을 디스크로 내린다. 파일은 처음 내릴 때 한 번만 쓴다
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not isinstance(entry[0], Dataset) or key in self._unspillable:
+                return False
+            dataset, nbytes = entry
+            path = self._spill_files.get(key)
+        if path is None:
+            path = self._write_spill(key, dataset.df)
+            if path is None:
+                with self._lock:
+                    self._unspillable.add(key)
+                return False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not dataset:
+                return False
+            # 파일을 쓰는 사이 _refresh_nbytes 로 크기가 바뀌었을 수 있다
+            nbytes = entry[1]
+            self._spill_files[key] = path
+            self._entries[key] = (
+                SpilledDataset(key, path, nbytes, dataset.profile, dataset.memory_report), 0
+            )
+            self._used_bytes -= nbytes
+            self.spills += 1
+        logger.info("spilled dataset %s (%.1f MB) to %s", key, nbytes / 1024 / 1024, path)
+        return True
+
+    def _resident_pinned(self):
+        # (lock 을 잡은 상태에서) 메모리에 있는 사용 중 데이터셋, 오래 쉰 순서
+        resident = [
+            (self._last_used.get(key, 0.0), key, nbytes)
+            for key, (value, nbytes) in self._entries.items()
+            if isinstance(value, Dataset) and key in self._refs and key not in self._unspillable
+        ]
+        return sorted(resident)
+
+    def _spill_over_budget(self) -> None:
+        # 제거할 수 있는 건 이미 제거됐으므로, 남은 초과분은 사용 중인 데이터셋을 내려서 맞춘다
+        with self._lock:
+            over = self._used_bytes - self.memory_budget_bytes
+            if over <= 0:
+                return
+            resident = self._resident_pinned()
+            # 가장 최근에 쓴 데이터셋은 지금 요청한 세션이 쓰고 있으므로 남긴다
+            resident = resident[:-1]
+            # 세션 예산을 넘는 데이터셋을 먼저 (안정 정렬이라 그 안에서는 오래 쉰 순서가 유지된다)
+            resident.sort(key=lambda item: item[2] <= self.session_budget_bytes)
+        # 내리지 못한 데이터셋은 건너뛰고 다음 후보로 넘어간다
+        for _, key, nbytes in resident:
+            if over <= 0:
+                break
+            if self.spill(key):
+                over -= nbytes
+
+    def _spill_over_session_budget(self, owner) -> None:
+        # 세션 하나가 세션 예산을 넘으면, 가장 최근에 쓴 것만 남기고 오래 쉰 데이터셋부터 내린다
+        with self._lock:
+            over = self._session_usage().get(owner, 0) - self.session_budget_bytes
+            if over <= 0:
+                return
+            resident = [item for item in self._resident_pinned() if owner in self._refs[item[1]]]
+        for _, key, nbytes in resident[:-1]:
+            if over <= 0:
+                break
+            if self.spill(key):
+                over -= nbytes
+
+    def spill_idle(self) -> int:
+        # SPILL_IDLE_S 동안 아무도 안 쓴 데이터셋을 내린다. 그 사이 마스크 캐시가 커졌으면 예산도 다시 맞춘다
+        self._drain_released()
+        deadline = time.monotonic() - self.idle_seconds
+        with self._lock:
+            self._refresh_nbytes()
+            victims = [
+                key for last_used, key, _ in self._resident_pinned() if last_used < deadline
+            ]
+        spilled = sum(self.spill(key) for key in victims)
+        self._spill_over_budget()
+        return spilled
+
+    def _start_sweeper(self) -> None:
+        # (lock 을 잡은 상태에서) 쉬는 세션 검사용 백그라운드 스레드를 한 번만 띄운다
+        if self._sweeper is not None or self.idle_seconds <= 0:
+            return
+
+        def sweep():
+            while True:
+                time.sleep(max(self.idle_seconds / 2, 5))
+                try:
+                    self.spill_idle()
+                except Exception:
+                    logger.exception("idle dataset spill failed")
+
+        self._sweeper = threading.Thread(target=sweep, name="dataset-spill", daemon=True)
+        self._sweeper.start()
+
+    def acquire(self, key, owner) -> None:
+        self._drain_released()
+        with self._lock:
+            self._refs.setdefault(key, set()).add(owner)
+            self._last_used[key] = time.monotonic()
+            self._start_sweeper()
+        self._spill_over_session_budget(owner)
+
+    def _drop_ref(self, key, owner) -> None:
+        # (lock 을 잡은 상태에서) 마지막 참조가 사라진 데이터셋이 디스크에 있으면 바로 지운다
+        owners = self._refs.get(key)
+        if owners is None:
+            return
+        owners.discard(owner)
+        if owners:
+            return
+        del self._refs[key]
+        entry = self._entries.get(key)
+        if entry is not None and isinstance(entry[0], SpilledDataset):
+            del self._entries[key]
+            self.evictions += 1
+            self._on_evict(key)
+
+    def release(self, key, owner) -> None:
+        self._drain_released()
+        with self._lock:
+            self._drop_ref(key, owner)
+            self._evict_over_budget()
+
+    def release_owner(self, owner) -> None:
+        with self._lock:
+            for key in [k for k, owners in self._refs.items() if owner in owners]:
+                self._drop_ref(key, owner)
+            self._evict_over_budget()
+
+    def _drain_released(self) -> None:
+        # (lock 을 잡기 전에) 수거된 세션들의 참조를 놓는다
+        while True:
+            try:
+                owner = self._released.get_nowait()
+            except queue.Empty:
+                return
+            self.release_owner(owner)
+
+    def stats(self) -> dict:
+        self._drain_released()
+        stats = super().stats()
+        with self._lock:
+            self._refresh_nbytes()
+            stats["used_bytes"] = self._used_bytes
+            stats["session_budget_bytes"] = self.session_budget_bytes
+            # 세션(owner)별 메모리에 둔 데이터셋 크기
+            stats["sessions"] = self._session_usage()
+            stats["pinned"] = len(self._refs)
+            stats["references"] = sum(len(owners) for owners in self._refs.values())
+            stats["spilled"] = sum(isinstance(v, SpilledDataset) for v, _ in self._entries.values())
+            stats["spills"] = self.spills
+            stats["reloads"] = self.reloads
+        return stats
+
+
+# 이 프로세스가 만든 스필 파일은 종료할 때 지운다
+_spill_paths = set()
+
+
+def _remove_file(path) -> None:
+    _spill_paths.discard(path)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@atexit.register
+def _cleanup_spill_files() -> None:
+    for path in list(_spill_paths):
+        _remove_file(path)
+
+
+_lease_ids = itertools.count()
+
+
+class DatasetLease:
+    """세션 하나가 쓰고 있는 데이터셋 참조. 세션 상태와 함께 사라지면 참조도 놓는다."""
+
+    def __init__(self, cache: DatasetCache):
+        self._cache = cache
+        self.owner = next(_lease_ids)
+        self.key = None
+        # self 를 잡지 않는 콜백이어야 세션이 끝날 때 이 객체가 수거된다.
+        # 파이널라이저에서는 캐시 lock 을 잡지 않고 (GC 가 lock 을 잡은 스레드에서 돌면 교착) 큐에 넣기만 한다
+        weakref.finalize(self, cache._released.put, self.owner)
+
+    def hold(self, key) -> None:
+        # 다른 데이터셋으로 바꾸면 이전 것은 놓는다 (None 이면 놓기만)
+        if key == self.key:
+            return
+        if self.key is not None:
+            self._cache.release(self.key, self.owner)
+        if key is not None:
+            self._cache.acquire(key, self.owner)
+        self.key = key
+
+
+class FrameCache(LRUCache):
+    """집계 결과처럼 작은 DataFrame 을 담는 캐시."""
+
+    def sizeof(self, value: pd.DataFrame) -> int:
+        return frame_nbytes(value)
+
+
+# 스트림릿은 모든 세션이 한 프로세스에서 돌기 때문에 모듈 전역 캐시 하나를 공유한다
+dataset_cache = DatasetCache(DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024)
+
+# 같은 업로드(file_id)에 대해 매 rerun 마다 전체 바이트를 다시 해시하지 않도록 기억
+_upload_keys = OrderedDict()
+_upload_keys_lock = threading.Lock()
+_MAX_UPLOAD_KEYS = 256
+
+
+def upload_key(uploaded_file, **options) -> str:
+    file_id = getattr(uploaded_file, "file_id", None)
+    memo_key = (file_id, tuple(sorted(options.items()))) if file_id else None
+    if memo_key is not None:
+        with _upload_keys_lock:
+            if memo_key in _upload_keys:
+                _upload_keys.move_to_end(memo_key)
+                return _upload_keys[memo_key]
+
+    key = hash_bytes(uploaded_file.getvalue(), **options)
+    if memo_key is not None:
+        with _upload_keys_lock:
+            _upload_keys[memo_key] = key
+            if len(_upload_keys) > _MAX_UPLOAD_KEYS:
+                _upload_keys.popitem(last=False)
+    return key
+
+
+def file_key(path: str, **options) -> str:
+    # 서버 파일은 내용 대신 (경로, 크기, 수정 시각) 으로 키를 만든다. 파일을 바꾸면 키도 바뀐다
+    stat = os.stat(path)
+    identity = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hash_bytes(identity.encode("utf-8"), **options)
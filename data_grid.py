@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+
+from charts import filter_key
+from data_cache import LRUCache
+from metrics import stage
+
+# 필터된 데이터를 서버에서 페이지 단위로 잘라 보여준다. 브라우저로는 보이는 페이지만 보낸다.
+# 정렬 결과는 (데이터셋 해시, 필터, 정렬 컬럼, 방향) 별로 원본 행 위치 배열로 캐시해서
+# 페이지를 넘기거나 같은 정렬로 돌아올 때 다시 정렬하지 않는다.
+
+PAGE_SIZES = [25, 50, 100, 500]
+NO_SORT = "정렬안함"
+
+# 정렬 순서 캐시가 쓸 수 있는 최대 메모리 (MB). 환경변수 ORDER_CACHE_MB 로 조정
+DEFAULT_ORDER_CACHE_MB = int(os.environ.get("ORDER_CACHE_MB", "64"))
+
+
+class OrderCache(LRUCache):
+    """행 위치 배열(np.ndarray)을 담는 캐시."""
+
+    def sizeof(self, value: np.ndarray) -> int:
+        return value.nbytes
+
+
+order_cache = OrderCache(DEFAULT_ORDER_CACHE_MB * 1024 * 1024)
+
+
+def _positions_dtype(n_rows: int):
+    # 행 위치는 대개 int32 로 충분하다 (캐시 메모리 절반)
+    return np.int32 if n_rows < np.iinfo(np.int32).max else np.int64
+
+
+def row_positions(dataset, selections: dict) -> np.ndarray:
+    # 필터를 통과한 원본 행 위치. 마스크만 쓰므로 프레임은 복사하지 않는다
+    dtype = _positions_dtype(len(dataset.df))
+    combined = dataset.filters.mask(selections)
+    if combined is None:
+        return np.arange(len(dataset.df), dtype=dtype)
+    return np.flatnonzero(combined).astype(dtype, copy=False)
+
+
+def sorted_positions(dataset, selections: dict, sort_col=None, ascending: bool = True) -> np.ndarray:
+    def compute():
+        rows = row_positions(dataset, selections)
+        if sort_col is not None:
+            with stage("sort", rows_in=len(rows)) as record:
+                # 정렬 컬럼 하나만 꺼내서 정렬한다. 결측치는 방향과 관계없이 맨 뒤
+                values = dataset.df[sort_col].iloc[rows].reset_index(drop=True)
+                options = dict(ascending=ascending, na_position="last", kind="stable")
+                try:
+                    order = values.sort_values(**options).index
+                except TypeError:
+                    # 숫자와 문자가 섞인 object 컬럼은 필터 선택지처럼 str 로 비교한다
+                    as_text = values.map(str, na_action="ignore")
+                    order = as_text.sort_values(**options).index
+                rows = rows[order.to_numpy()]
+                record["rows_out"] = len(rows)
+        rows.flags.writeable = False  # 여러 세션이 공유하므로 읽기 전용
+        return rows
+
+    key = (dataset.key, filter_key(selections), sort_col, ascending)
+    return order_cache.get_or_load(key, compute)
+
+
+def grid_page(dataset, selections: dict, columns, sort_col=None, ascending: bool = True,
+              page: int = 0, page_size: int = 100):
+    # (페이지 DataFrame, 전체 행 수, 실제 페이지 번호, 페이지 수). page 는 0부터, 범위를 벗어나면 맞춘다
+    positions = sorted_positions(dataset, selections, sort_col, ascending)
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = min(max(page, 0), n_pages - 1)
+    rows = positions[page * page_size:(page + 1) * page_size]
+    # 컬럼 선택은 복사하지 않고, 보이는 행만 복사된다
+    page_df = dataset.df[list(columns)].iloc[rows]
+    return page_df, len(positions), page, n_pages
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# 로드한 데이터의 dtype 을 값이 바뀌지 않는 범위에서 줄인다. 환경변수 COMPACT_DTYPES=0 이면 끈다
+COMPACT_DTYPES = os.environ.get("COMPACT_DTYPES", "1") == "1"
+
+# 고유값이 행 수의 이 비율 이하인 문자열 컬럼은 category 로 바꾼다 (종/섬/성별 같은 컬럼)
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _compact_numeric(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(series) or not isinstance(series.dtype, np.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        # 값 범위에 맞는 가장 작은 정수형 (범위 검사라서 손실 없음)
+        return pd.to_numeric(series, downcast="integer")
+    if series.dtype == np.float64:
+        # float32 로 왕복해도 모든 값이 그대로일 때만 바꾼다 (39.1 같은 소수는 대개 그대로 둔다)
+        values = series.to_numpy()
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+
+def _compact_text(series: pd.Series) -> pd.Series:
+    if not (pd.api.types.is_string_dtype(series) or series.dtype == object):
+        return series
+    n_rows = len(series)
+    if n_rows == 0 or series.nunique(dropna=True) > n_rows * CATEGORY_MAX_RATIO:
+        return series
+    # 섞인 타입(숫자+문자) object 컬럼은 category 로 바꾸면 필터 라벨이 달라질 수 있어 건너뛴다
+    if series.dtype == object and not series.dropna().map(type).eq(str).all():
+        return series
+    return series.astype("category")
+
+
+def compact_frame(df: pd.DataFrame):
+    # (줄인 DataFrame, 리포트). 리포트: 바뀐 컬럼과 전/후 메모리(MB)
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    columns = {}
+    changed = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            compacted = _compact_numeric(series)
+        else:
+            compacted = _compact_text(series)
+        if compacted.dtype != series.dtype:
+            changed[col] = compacted
+            columns[col] = f"{series.dtype} -> {compacted.dtype}"
+    if changed:
+        # assign(**changed) 는 문자열이 아닌 컬럼 이름(.xls 의 연도 헤더 등)에서 실패한다.
+        # 얕은 복사본에 하나씩 넣는다 (Copy-on-Write 라서 원본은 바뀌지 않는다)
+        df = df.copy(deep=False)
+        for col, compacted in changed.items():
+            df[col] = compacted
+    after = int(df.memory_usage(index=True, deep=True).sum())
+    report = {
+        "before_mb": round(before / 1024 / 1024, 2),
+        "after_mb": round(after / 1024 / 1024, 2),
+        "columns": columns,
+    }
+    return df, report
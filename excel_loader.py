@@ -0,0 +1,144 @@
+import io
+import posixpath
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+
+# 한 번에 DataFrame 으로 만드는 행 수 (파이썬 객체 리스트가 커지지 않도록)
+DEFAULT_CHUNK_ROWS = 50_000
+
+# pd.read_excel 이 기본으로 결측치로 보는 문자열
+NA_STRINGS = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+]
+
+
+def _zip_source(source):
+    # bytes 는 메모리에서, 경로는 파일에서 바로 연다
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _is_xlsx(data) -> bool:
+    # xlsx 는 zip 컨테이너, 예전 xls(BIFF) 는 openpyxl 로 읽을 수 없다
+    return zipfile.is_zipfile(_zip_source(data))
+
+
+def _open_workbook(data: bytes):
+    import openpyxl
+
+    # read_only 모드는 시트 내용을 필요할 때 스트리밍으로만 읽는다
+    return openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _workbook_part(archive: zipfile.ZipFile) -> str:
+    # 패키지 관계(_rels/.rels)의 officeDocument 가 가리키는 파트. 대개 xl/workbook.xml
+    try:
+        rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "xl/workbook.xml"
+    for rel in rels:
+        if rel.get("Type", "").endswith("/officeDocument"):
+            return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    return "xl/workbook.xml"
+
+
+def list_sheets(source) -> list:
+    # source: 바이트 또는 파일 경로. xlsx 는 workbook.xml 의 시트 목록만 읽는다
+    # (openpyxl 은 read_only 여도 공유 문자열/스타일을 모두 파싱해서 큰 파일은 몇 초씩 걸린다)
+    if not _is_xlsx(source):
+        return pd.ExcelFile(_zip_source(source)).sheet_names
+    with zipfile.ZipFile(_zip_source(source)) as archive:
+        workbook = ElementTree.fromstring(archive.read(_workbook_part(archive)))
+    return [
+        element.get("name")
+        for element in workbook.iter()
+        if _local_name(element.tag) == "sheet"
+    ]
+
+
+def _make_header(raw_header) -> list:
+    # pd.read_excel 과 같은 규칙: 빈 헤더는 'Unnamed: i', 중복은 '.1', '.2' 를 붙인다
+    header = []
+    seen = {}
+    for i, name in enumerate(raw_header):
+        name = f"Unnamed: {i}" if name is None else str(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def _rows_to_frame(rows: list, header: list) -> pd.DataFrame:
+    chunk = pd.DataFrame.from_records(rows, columns=header)
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_numeric_dtype(series):
+            continue
+        na_mask = series.isin(NA_STRINGS)
+        if na_mask.any():
+            chunk[col] = series.mask(na_mask)
+    return chunk.infer_objects()
+
+
+def read_sheet(data: bytes, sheet_name=None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               progress=None) -> pd.DataFrame:
+    # progress(fraction) 콜백: 전체 행 수를 알 수 없으면 None 을 넘긴다
+    if not _is_xlsx(data):
+        return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name or 0)
+
+    wb = _open_workbook(data)
+    try:
+        ws = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        total_rows = ws.max_row  # 시트의 dimension 정보가 없으면 None
+        rows = ws.iter_rows(values_only=True)
+
+        raw_header = next(rows, None)
+        if raw_header is None:
+            return pd.DataFrame()
+        header = _make_header(raw_header)
+        n_cols = len(header)
+
+        chunks = []
+        buffer = []
+        n_read = 0
+        blank_rows = 0
+        blank_row = (None,) * n_cols
+        for row in rows:
+            n_read += 1
+            # read_excel 처럼 중간의 빈 행은 결측치 행으로 남기고, 끝에 붙은 빈 행만 버린다
+            if all(v is None for v in row):
+                blank_rows += 1
+                continue
+            if blank_rows:
+                buffer.extend([blank_row] * blank_rows)
+                blank_rows = 0
+            if len(row) < n_cols:
+                row = row + (None,) * (n_cols - len(row))
+            buffer.append(row[:n_cols])
+            if len(buffer) >= chunk_rows:
+                chunks.append(_rows_to_frame(buffer, header))
+                buffer = []
+                if progress is not None:
+                    progress(min(n_read / total_rows, 1.0) if total_rows else None)
+        if buffer or not chunks:
+            chunks.append(_rows_to_frame(buffer, header))
+        del buffer
+    finally:
+        wb.close()
+
+    if progress is not None:
+        progress(1.0)
+    if len(chunks) == 1:
+        return chunks[0]
+    # 청크마다 추론된 dtype 이 다를 수 있으므로 합친 뒤 한 번 더 맞춘다
+    return pd.concat(chunks, ignore_index=True).infer_objects()
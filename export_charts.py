@@ -0,0 +1,170 @@
+"""화면 없이 차트를 일괄로 내보내는 명령행 도구.
+
+    python export_charts.py data/penguins_data.xlsx charts.yaml --out out --format png --workers 4
+
+차트 목록(JSON 또는 YAML)은 리스트이거나 {"charts": [...]} 형태이고, 항목마다 화면의 선택값을 그대로 쓴다:
+
+    - name: 종별_체중
+      graph_type: 상자그림
+      x: 펭귄 종
+      y: 체중(g)
+      group: 성별
+      filters: {섬: [Biscoe, Dream]}
+    - graph_type: 막대그래프
+      x: 섬
+      y: 체중(g)
+      agg: 평균
+      format: svg
+
+데이터 파일은 한 번만 읽고 프로파일링한 뒤, 워커 프로세스마다 Arrow 로 한 번씩 넘겨서 차트만 병렬로 그린다.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from charts import AGG_METHODS, COUNT, GRAPH_TYPES, NOT_USED, ChartError, build_plot, make_spec
+from column_profile import build_profile, column_is_continuous
+from dtype_compact import COMPACT_DTYPES, compact_frame
+
+FORMATS = ("png", "svg", "pdf")
+
+# 워커 프로세스의 데이터셋 (initializer 에서 한 번만 채운다)
+_worker = {}
+
+
+def load_chart_list(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("YAML 차트 목록을 읽으려면 PyYAML 이 필요합니다 (pip install pyyaml).")
+        charts = yaml.safe_load(text)
+    else:
+        charts = json.loads(text)
+    if isinstance(charts, dict):
+        charts = charts.get("charts", [])
+    if not isinstance(charts, list):
+        raise SystemExit("차트 목록은 리스트이거나 {'charts': [...]} 형태여야 합니다.")
+    return charts
+
+
+def _file_stem(i: int, item: dict) -> str:
+    name = item.get("name") or f"{i:03d}_{item.get('graph_type', 'chart')}"
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name)).strip("_")
+
+
+def prepare_job(i: int, item: dict, profile: dict, out_dir: str, default_format: str):
+    # 항목 하나를 (PlotSpec, 필터, 출력 경로) 로 바꾼다. 잘못된 항목은 ChartError
+    graph_type = item.get("graph_type")
+    if graph_type not in GRAPH_TYPES[1:]:
+        raise ChartError(f"알 수 없는 그래프 종류: {graph_type!r}")
+    agg_method = item.get("agg")
+    if agg_method is not None and agg_method not in AGG_METHODS:
+        raise ChartError(f"알 수 없는 집계 방식: {agg_method!r}")
+    fmt = item.get("format", default_format)
+    if fmt not in FORMATS:
+        raise ChartError(f"지원하지 않는 형식: {fmt!r}")
+
+    x_col, y_col = item.get("x", NOT_USED), item.get("y", NOT_USED)
+    group_col, color_col = item.get("group"), item.get("color")
+    for col in (x_col, y_col, group_col, color_col):
+        if col not in (None, NOT_USED, COUNT) and col not in profile:
+            raise ChartError(f"없는 컬럼: {col!r}")
+
+    selections = {}
+    for col, values in (item.get("filters") or {}).items():
+        if col not in profile or column_is_continuous(profile, col):
+            raise ChartError(f"필터는 이산형 컬럼에만 걸 수 있습니다: {col!r}")
+        selections[col] = [str(v) for v in (values if isinstance(values, list) else [values])]
+
+    spec = make_spec(
+        graph_type, x_col, y_col,
+        group_col=group_col, color_col=color_col, bins=item.get("bins", 30),
+        agg_method=agg_method, selections=selections,
+        box_fill=item.get("box_fill", "steelblue"),
+    )
+    return spec, selections, os.path.join(out_dir, f"{_file_stem(i, item)}.{fmt}"), fmt
+
+
+def _init_worker(payload: bytes):
+    import pyarrow as pa
+
+    from app_init import chart_theme
+    from filter_engine import FilterEngine
+
+    df = pa.ipc.open_stream(payload).read_all().to_pandas()
+    _worker["filters"] = FilterEngine(df)
+    chart_theme()
+
+
+def render_job(spec, selections: dict, path: str, fmt: str, dpi: int):
+    from renderer import render_bytes
+
+    start = time.perf_counter()
+    df = _worker["filters"].apply(selections)
+    data = render_bytes(build_plot(df, spec), fmt, dpi)
+    with open(path, "wb") as f:
+        f.write(data)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="데이터 파일로 차트를 일괄 내보내기")
+    parser.add_argument("workbook", help="데이터 파일 (엑셀, CSV, Parquet, Feather/Arrow)")
+    parser.add_argument("charts", help="차트 목록 (JSON 또는 YAML)")
+    parser.add_argument("--sheet", help="엑셀 시트 이름 (기본: 첫 시트)")
+    parser.add_argument("--out", default="charts_out", help="출력 폴더")
+    parser.add_argument("--format", default="png", choices=FORMATS, help="기본 출력 형식")
+    parser.add_argument("--dpi", type=int, default=None, help="래스터 해상도 (기본: RENDER_DPI)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="워커 프로세스 수")
+    args = parser.parse_args(argv)
+
+    from render_pool import encode_frame
+    from table_loader import read_table
+
+    start = time.perf_counter()
+    df = read_table(args.workbook, args.workbook, args.sheet)
+    if COMPACT_DTYPES:
+        df, _ = compact_frame(df)
+    profile = build_profile(df)
+    print(f"데이터 {len(df):,}행 x {len(df.columns)}열 읽음 ({time.perf_counter() - start:.1f}s)")
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs, done, failed = [], 0, 0
+    for i, item in enumerate(load_chart_list(args.charts)):
+        try:
+            jobs.append(prepare_job(i, item, profile, args.out, args.format))
+        except ChartError as e:
+            failed += 1
+            print(f"[건너뜀] {i}: {e}", file=sys.stderr)
+
+    # 워커마다 데이터프레임을 한 번만 받는다 (차트마다 보내지 않음)
+    payload = encode_frame(df, df.columns)
+    workers = max(1, min(args.workers, len(jobs)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(payload,)) as pool:
+        futures = {
+            pool.submit(render_job, spec, selections, path, fmt, args.dpi): path
+            for spec, selections, path, fmt in jobs
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                elapsed_ms = future.result()
+                done += 1
+                print(f"{path} ({elapsed_ms:.0f} ms)")
+            except Exception as e:
+                failed += 1
+                print(f"[실패] {path}: {e}", file=sys.stderr)
+
+    print(f"완료 {done}개, 실패 {failed}개 ({time.perf_counter() - start:.1f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# 컬럼별 마스크 캐시가 쓸 수 있는 최대 메모리 (MB). 환경변수 MASK_CACHE_MB 로 조정
+DEFAULT_MASK_CACHE_MB = int(os.environ.get("MASK_CACHE_MB", "64"))
+
+
+def _drop_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+    # category 컬럼은 걸러진 값도 범주로 남아 범례/축에 나타나므로 남은 값만 범주로 둔다.
+    # cat.remove_unused_categories() 는 unique 를 다시 계산해서 느리므로 코드 빈도표로 직접 바꾼다
+    changed = {}
+    for col in df.columns:
+        series = df[col]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        codes = series.cat.codes.to_numpy()
+        n_categories = len(series.cat.categories)
+        used = np.bincount(np.add(codes, 1, dtype=np.intp), minlength=n_categories + 1)[1:] > 0
+        if used.all():
+            continue
+        # 결측치(-1)는 -1 그대로, 나머지는 남은 범주 안에서 새 번호
+        remap = np.full(n_categories + 1, -1, dtype=codes.dtype)
+        remap[1:][used] = np.arange(used.sum(), dtype=codes.dtype)
+        categorical = pd.Categorical.from_codes(
+            remap[np.add(codes, 1, dtype=np.intp)],
+            dtype=pd.CategoricalDtype(series.cat.categories[used], ordered=series.cat.ordered),
+            validate=False,
+        )
+        changed[col] = pd.Series(categorical, index=series.index, name=col)
+    if not changed:
+        return df
+    # 컬럼 이름이 문자열이 아닐 수 있어 assign(**changed) 대신 하나씩 넣는다
+    df = df.copy(deep=False)
+    for col, series in changed.items():
+        df[col] = series
+    return df
+
+
+class FilterEngine:
+    """이산형 컬럼을 한 번만 정수 코드로 인코딩해 두고, 필터는 코드 위의 불리언 마스크로 계산한다."""
+
+    def __init__(self, df: pd.DataFrame, columns=(), mask_cache_bytes: int = None):
+        self.df = df
+        self._encoded = {}  # col -> (codes, labels)
+        for col in columns:
+            self.encode(col)
+
+        # (col, 선택값 집합) -> 마스크. 필터 하나만 바뀌면 그 컬럼 마스크만 새로 만든다
+        if mask_cache_bytes is None:
+            mask_cache_bytes = DEFAULT_MASK_CACHE_MB * 1024 * 1024
+        self.mask_cache_bytes = mask_cache_bytes
+        self._masks = OrderedDict()
+        self._masks_nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, col):
+        encoded = self._encoded.get(col)
+        if encoded is None:
+            codes, uniques = pd.factorize(self.df[col], use_na_sentinel=True)
+            # 결측치는 -1 코드. 라벨은 멀티셀렉트 선택지와 같은 str 표현
+            dtype = np.int16 if len(uniques) < np.iinfo(np.int16).max else np.int32
+            labels = np.array([str(u) for u in uniques], dtype=object)
+            encoded = (codes.astype(dtype, copy=False), labels)
+            self._encoded[col] = encoded
+        return encoded
+
+    def _build_mask(self, col, selected: frozenset) -> np.ndarray:
+        codes, labels = self.encode(col)
+        # 마지막 칸은 결측치(-1) 용으로 항상 False
+        lookup = np.zeros(len(labels) + 1, dtype=bool)
+        lookup[:-1] = np.isin(labels, list(selected))
+        return lookup[codes]
+
+    def column_mask(self, col, selected) -> np.ndarray:
+        cache_key = (col, frozenset(selected))
+        with self._lock:
+            col_mask = self._masks.get(cache_key)
+            if col_mask is not None:
+                self._masks.move_to_end(cache_key)
+                self.hits += 1
+                return col_mask
+            self.misses += 1
+
+        col_mask = self._build_mask(col, cache_key[1])
+        col_mask.flags.writeable = False  # 여러 세션이 공유하므로 읽기 전용
+        with self._lock:
+            if cache_key not in self._masks:
+                self._masks[cache_key] = col_mask
+                self._masks_nbytes += col_mask.nbytes
+            while self._masks_nbytes > self.mask_cache_bytes and len(self._masks) > 1:
+                _, old_mask = self._masks.popitem(last=False)
+                self._masks_nbytes -= old_mask.nbytes
+        return col_mask
+
+    def mask(self, selections: dict):
+        # 선택 결과를 모두 AND. 필터가 없으면 None
+        combined = None
+        for col, selected in selections.items():
+            col_mask = self.column_mask(col, selected)
+            # & 는 새 배열을 만들므로 캐시된 마스크는 바뀌지 않는다
+            combined = col_mask if combined is None else (combined & col_mask)
+        return combined
+
+    def apply(self, selections: dict, columns=None) -> pd.DataFrame:
+        # columns 를 주면 그 컬럼만 꺼낸다. 원본은 여러 세션이 공유하므로 절대 수정하지 않는다
+        # (pandas Copy-on-Write 라서 컬럼 선택은 데이터를 복사하지 않는다)
+        df = self.df if columns is None else self.df[list(columns)]
+        combined = self.mask(selections)
+        if combined is None or combined.all():
+            # 아무것도 걸러지지 않으면 원본을 그대로 쓴다 (복사 없음)
+            return df
+        # 걸러진 행은 필요한 컬럼만 복사한다
+        return _drop_unused_categories(df.iloc[np.flatnonzero(combined)])
+
+    @property
+    def nbytes(self) -> int:
+        # 코드 + 마스크 캐시. 마스크 캐시는 필터를 쓸수록 (mask_cache_bytes 까지) 커진다
+        return sum(codes.nbytes for codes, _ in self._encoded.values()) + self._masks_nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "masks": len(self._masks),
+                "mask_bytes": self._masks_nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 실행(rerun) 단위 계측. trace() 로 한 번의 실행을 묶고, 그 안의 stage() 마다
+# 걸린 시간, 입력/출력 행 수, RSS 변화량을 기록한다. 실행이 끝나면 JSON 한 줄로 내보낸다.
+#   - logging: "metrics" 로거에 INFO 로 기록 (모니터링 쪽에서 핸들러를 붙이면 수집됨)
+#   - 파일: 환경변수 METRICS_LOG 에 경로를 주면 JSON Lines 로 이어쓴다
+#   - 코드: add_sink(fn) 으로 완료된 trace(dict) 를 받는다
+
+logger = logging.getLogger("metrics")
+
+METRICS_LOG = os.environ.get("METRICS_LOG")
+# 사이드바 개발자 패널. 환경변수 DEV_PANEL=1 또는 주소에 ?dev=1
+DEV_PANEL = os.environ.get("DEV_PANEL") == "1"
+
+_local = threading.local()
+_lock = threading.Lock()
+_sinks = []
+# 최근 완료된 실행 (프로세스 전체)
+recent_traces = deque(maxlen=50)
+
+
+def rss_bytes():
+    # 현재 RSS (리눅스 /proc). 없으면 최대 RSS 로 대신한다
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return None
+
+
+def _mb(n_bytes):
+    return None if n_bytes is None else round(n_bytes / 1024 / 1024, 2)
+
+
+def add_sink(sink) -> None:
+    with _lock:
+        _sinks.append(sink)
+
+
+def current_trace():
+    # 이 스레드에서 진행 중인 실행. 없으면 None
+    return getattr(_local, "trace", None)
+
+
+def last_trace():
+    # 이 스레드에서 마지막으로 끝난 실행
+    return getattr(_local, "last", None)
+
+
+@contextmanager
+def trace(name: str, **fields):
+    # 이미 진행 중인 실행이 있으면 그 안에 합친다 (fragment 가 전체 실행 안에서 호출될 때)
+    current = current_trace()
+    if current is not None:
+        yield current
+        return
+    current = {"trace": name, "at": time.strftime("%Y-%m-%dT%H:%M:%S"), **fields, "stages": []}
+    _local.trace = current
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        _local.trace = None
+        current["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        current["rss_mb"] = _mb(rss_bytes())
+        _local.last = current
+        _emit(current)
+
+
+@contextmanager
+def stage(name: str, rows_in: int = None):
+    # 진행 중인 실행이 없으면 (백그라운드 스레드, 배치 도구 등) 아무것도 기록하지 않는다
+    record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+    current = current_trace()
+    if current is None:
+        yield record
+        return
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        rss_after = rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            # 프로세스 전체 RSS 라서 동시에 도는 다른 세션의 할당도 섞일 수 있다
+            record["rss_delta_mb"] = _mb(rss_after - rss_before)
+        current["stages"].append(record)
+
+
+def _emit(finished: dict) -> None:
+    recent_traces.append(finished)
+    line = json.dumps(finished, ensure_ascii=False, default=str)
+    logger.info("%s", line)
+    with _lock:
+        sinks = list(_sinks)
+        if METRICS_LOG:
+            try:
+                with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                logger.exception("metrics log write failed: %s", METRICS_LOG)
+    for sink in sinks:
+        try:
+            sink(finished)
+        except Exception:
+            logger.exception("metrics sink failed")
@@ -1,60 +1,120 @@
+import os
+from dataclasses import replace
+
 import streamlit as st
 import pandas as pd
-import matplotlib
-import matplotlib.pyplot as plt
-from plotnine import (
-    ggplot, aes, geom_histogram, geom_point, geom_bar,
-    geom_boxplot, geom_col, geom_line, theme_minimal, theme, element_text
+from app_init import startup_timings, warm_up_in_background
+from charts import (
+    AGG_METHODS, CHART_BACKENDS, PREVIEW_ROWS, ChartError, GRAPH_TYPES, aggregate_cache, cached_chart,
+    cached_chart_png, chart_cache, filter_key, make_spec, preview_chart_png, spec_columns
 )
-import matplotlib.font_manager as font_manager
-
-# 1. (GitHub Actions 등 리눅스 환경) apt-get install fonts-nanum
-# 2. Python 코드에서 폰트 설정:
-font_path = 'font/NanumGothic-Bold.ttf'
-font_manager.fontManager.addfont(font_path)
-plt.rcParams['font.family'] = 'NanumGothic'
-plt.rcParams['axes.unicode_minus'] = False
-
-def is_continuous(series: pd.Series) -> bool:
-    return pd.api.types.is_numeric_dtype(series)
-
-def load_data(uploaded_file) -> pd.DataFrame:
+from column_profile import build_profile, column_is_continuous, discrete_columns
+from data_grid import NO_SORT, PAGE_SIZES, grid_page, order_cache
+from data_cache import Dataset, DatasetLease, dataset_cache, file_key, upload_key
+from dtype_compact import COMPACT_DTYPES, compact_frame
+from excel_loader import list_sheets
+from filter_engine import FilterEngine
+from metrics import DEV_PANEL, current_trace, last_trace, recent_traces, stage, trace
+from plotly_charts import build_figure
+from progressive import PROGRESSIVE_RENDER, REFINE_POLL_S, RefineJob, refine_stats
+from render_pool import pool_stats
+from renderer import figure_stats
+from table_loader import DATA_DIR, SUPPORTED_TYPES, is_excel, list_data_files, read_table
+
+def read_with_progress(source, name, sheet_name) -> pd.DataFrame:
+    label = f"'{sheet_name}' 시트" if sheet_name else f"'{os.path.basename(name)}'"
+    progress_bar = st.progress(0.0, text=f"{label} 읽는 중...")
+
+    def on_progress(fraction):
+        if fraction is not None:
+            progress_bar.progress(fraction, text=f"{label} 읽는 중... {fraction:.0%}")
+
+    try:
+        return read_table(source, name, sheet_name, progress=on_progress)
+    finally:
+        progress_bar.empty()
+
+def select_sheet(source):
+    # 시트 목록만 먼저 읽고(workbook.xml), 선택한 시트만 파싱. source: 업로드 바이트 또는 서버 파일 경로
+    sheet_names = list_sheets(source)
+    if len(sheet_names) > 1:
+        return st.selectbox("시트 선택", sheet_names)
+    return sheet_names[0]
+
+def dataset_lease() -> DatasetLease:
+    # 세션마다 하나. 세션이 끝나 session_state 가 사라지면 데이터셋 참조도 놓인다
+    if "dataset_lease" not in st.session_state:
+        st.session_state["dataset_lease"] = DatasetLease(dataset_cache)
+    return st.session_state["dataset_lease"]
+
+def load_data(uploaded_file, sheet_name=None, path=None) -> Dataset:
+    # 같은 파일이면 rerun 때마다, 그리고 다른 세션에서도 다시 파싱하지 않고
+    # 프로세스에 하나만 있는 데이터셋(df + 컬럼 프로파일)을 같이 쓴다
     if uploaded_file is not None:
-        return pd.read_excel(uploaded_file)
-    return None
-
-def main():
-    st.title("간단한 시각화 App (ggplot 방식)")
-
-    # --- 1) 데이터 업로드 ---
-    uploaded_file = st.file_uploader("엑셀 파일을 업로드하세요", type=["xlsx", "xls"])
-    df = load_data(uploaded_file)
-
-    if df is not None:
-        st.success("데이터 업로드 성공!")
-        st.write("미리보기:")
-        st.dataframe(df.head())
+        key = upload_key(uploaded_file, sheet_name=sheet_name)
+        name = uploaded_file.name
+    elif path is not None:
+        key = file_key(path, sheet_name=sheet_name)
+        name = path
     else:
-        st.info("엑셀 파일을 업로드해주세요.")
-
-    st.markdown("---")
+        dataset_lease().hold(None)
+        return None
+    # 이 세션이 쓰는 동안은 캐시 예산을 넘어도 제거되지 않는다
+    dataset_lease().hold(key)
+
+    def parse() -> Dataset:
+        # 서버 파일은 경로째 넘겨서 Arrow/Parquet 를 메모리 매핑으로 읽는다
+        source = uploaded_file.getvalue() if uploaded_file is not None else path
+        with stage("load") as record:
+            df = read_with_progress(source, name, sheet_name)
+            record["rows_out"] = len(df)
+        memory_report = {}
+        if COMPACT_DTYPES:
+            # 값이 바뀌지 않는 범위에서 숫자형은 작은 타입으로, 값 종류가 적은 문자열은 category 로
+            with stage("compact", rows_in=len(df)):
+                df, memory_report = compact_frame(df)
+        with stage("profile", rows_in=len(df)):
+            profile = build_profile(df)
+            filters = FilterEngine(df, discrete_columns(profile))
+        return Dataset(key=key, df=df, profile=profile, filters=filters, memory_report=memory_report)
+
+    return dataset_cache.get_or_load(key, parse)
+
+def current_dataset(dataset_key) -> Dataset:
+    # fragment 는 인자를 붙잡아 두므로 Dataset 대신 키를 넘기고 실행할 때마다 캐시에서 꺼낸다.
+    # 디스크로 내려간 데이터셋은 여기서 다시 올라온다
+    if dataset_key is None:
+        return None
+    dataset = dataset_cache.get(dataset_key)
+    if dataset is None:
+        st.warning("데이터가 메모리에서 해제되었습니다. 파일을 다시 선택해주세요.")
+    return dataset
+
+@st.fragment
+def axis_section(dataset_key):
+    dataset = current_dataset(dataset_key)
+    profile = dataset.profile if dataset is not None else {}
 
     # --- 2) 그래프 종류, X축, Y축 선택 ---
     col_graph_type, col_x, col_y = st.columns([1.3, 1, 1])
     with col_graph_type:
         graph_type = st.selectbox(
             "그래프 종류 선택",
-            ["선택안함", "히스토그램", "산점도", "막대그래프", "상자그림", "선그래프"]
+            GRAPH_TYPES
         )
     with col_x:
-        x_col = st.selectbox("X축", options=["사용안함"] + (df.columns.tolist() if df is not None else []))
+        x_col = st.selectbox("X축", options=["사용안함"] + list(profile))
     with col_y:
-        if df is not None:
-            y_options = ["사용안함", "개수"] + df.columns.tolist()
-        else:
-            y_options = ["사용안함", "개수"]
+        y_options = ["사용안함", "개수"] + list(profile)
         y_col = st.selectbox("Y축", options=y_options)
 
+    options_section(dataset_key, graph_type, x_col, y_col)
+
+@st.fragment
+def options_section(dataset_key, graph_type, x_col, y_col):
+    dataset = current_dataset(dataset_key)
+    profile = dataset.profile if dataset is not None else {}
+
     st.markdown("---")
 
     # --- 3) 그래프별 옵션 ---
@@ -63,263 +123,304 @@ def main():
     bins = None
     color_col = None
     group_col = None
-    agg_method = None  # 막대그래프용 (합계/평균)
+    agg_method = None  # 막대그래프용 (합계/평균/...)
 
-    if df is not None and graph_type != "선택안함":
+    if dataset is not None and graph_type != "선택안함":
         if graph_type == "히스토그램":
             st.markdown("**히스토그램 옵션**")
             bins = st.slider("빈(bin) 개수", 5, 100, 20, 1)
 
             st.markdown("**그룹 옵션** (겹쳐진 히스토그램)")
-            discrete_cols = [c for c in df.columns if not is_continuous(df[c])]
+            discrete_cols = discrete_columns(profile)
             group_col = st.selectbox("그룹(옵션)", ["없음"] + discrete_cols)
 
         elif graph_type == "산점도":
             st.markdown("**산점도 옵션**")
-            discrete_cols = [c for c in df.columns if not is_continuous(df[c])]
+            discrete_cols = discrete_columns(profile)
             color_col = st.selectbox("색상(이산형 변수)", ["없음"] + discrete_cols)
 
         elif graph_type == "막대그래프":
             st.markdown("**막대그래프 옵션**")
             # x는 이산형
             # y = 개수 or 연속형(geom_col)
-            discrete_cols_except_x = [
-                c for c in df.columns
-                if (not is_continuous(df[c])) and c != x_col
-            ]
+            discrete_cols_except_x = discrete_columns(profile, exclude=x_col)
             group_col = st.selectbox("그룹(옵션)", ["없음"] + discrete_cols_except_x)
 
-            # 집계 방식: y축이 개수가 아닐 때 '합계', '평균' 중 선택
+            # 집계 방식: y축이 개수가 아닐 때 합계/평균/중앙값 등 중 선택
             # (y 연속형인 경우)
-            if y_col not in ["사용안함", "개수"] and is_continuous(df[y_col]):
-                agg_method = st.selectbox("집계 방식", ["합계", "평균"])
+            if y_col not in ["사용안함", "개수"] and column_is_continuous(profile, y_col):
+                agg_method = st.selectbox("집계 방식", list(AGG_METHODS))
 
         elif graph_type == "상자그림":
             st.markdown("**상자그림 옵션**")
-            discrete_cols_except_x = [
-                c for c in df.columns
-                if (not is_continuous(df[c])) and c != x_col
-            ]
+            discrete_cols_except_x = discrete_columns(profile, exclude=x_col)
             group_col = st.selectbox("그룹(옵션)", ["없음"] + discrete_cols_except_x)
 
         elif graph_type == "선그래프":
             st.markdown("**선그래프 옵션**")
-            discrete_cols_all = [c for c in df.columns if not is_continuous(df[c])]
+            discrete_cols_all = discrete_columns(profile)
             color_col = st.selectbox("색상(이산형, 옵션)", ["없음"] + discrete_cols_all)
 
     st.markdown("---")
 
     # --- 4) 그래프 결과 ---
     st.markdown("### 그래프 결과")
-    plot = None
-    filtered_df = df.copy() if df is not None else None
-
-    if df is not None and graph_type != "선택안함":
-        # --- 5) 이산형 필터 ---
-        discrete_filter_cols = []
-        for c in [x_col, y_col, group_col, color_col]:
-            if c and c not in ["사용안함", "없음", "개수"] and (not is_continuous(df[c])):
-                discrete_filter_cols.append(c)
-        discrete_filter_cols = list(dict.fromkeys(discrete_filter_cols))
-
-        for col_name in discrete_filter_cols:
-            raw_vals = filtered_df[col_name].dropna().unique()
-            unique_vals_str = sorted(map(str, raw_vals))
-            selected_vals_str = st.multiselect(
-                f"'{col_name}' 필터 선택",
-                unique_vals_str,
-                default=unique_vals_str
-            )
-            # 필터 적용
-            filtered_df = filtered_df[filtered_df[col_name].astype(str).isin(selected_vals_str)]
-
-        # 그래프를 그리기 위한 타입 체크
-        x_is_cont = (x_col != "사용안함") and is_continuous(filtered_df[x_col])
-        y_is_cont = (y_col not in ["사용안함", "개수"]) and is_continuous(filtered_df[y_col])
-
-        from plotnine import ggplot, aes, theme_minimal
-
-        # --- 그래프별 로직 ---
-        if graph_type == "히스토그램":
-            if x_col != "사용안함" and x_is_cont:
-                if group_col and group_col != "없음":
-                    plot = (
-                        ggplot(filtered_df, aes(x=x_col, fill=group_col))
-                        + geom_histogram(
-                            bins=bins,
-                            color="white",
-                            alpha=0.5,
-                            position="identity"
-                        )
-                        + theme_minimal()
-                        + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                    )
-                else:
-                    plot = (
-                        ggplot(filtered_df, aes(x=x_col))
-                        + geom_histogram(bins=bins, fill="steelblue", color="white")
-                        + theme_minimal()
-                        + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                    )
-            else:
-                st.error("히스토그램은 X축에 연속형 변수가 필요합니다.")
 
-        elif graph_type == "산점도":
-            if x_col != "사용안함" and y_col not in ["사용안함", "개수"] and x_is_cont and y_is_cont:
-                if color_col and color_col != "없음":
-                    plot = (
-                        ggplot(filtered_df, aes(x=x_col, y=y_col, color=color_col))
-                        + geom_point()
-                        + theme_minimal()
-                        + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                    )
-                else:
-                    plot = (
-                        ggplot(filtered_df, aes(x=x_col, y=y_col))
-                        + geom_point(color="steelblue")
-                        + theme_minimal()
-                        + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                    )
-            else:
-                st.error("산점도는 X, Y 모두 연속형 변수가 필요합니다.")
+    if dataset is not None and graph_type != "선택안함":
+        spec = make_spec(
+            graph_type, x_col, y_col,
+            group_col=group_col, color_col=color_col, bins=bins,
+            agg_method=agg_method,
+            box_fill=None,  # 상자그림(그룹 없음)은 기본 색
+        )
+        filter_section(dataset_key, spec)
+    else:
+        # 그래프를 그리지 않으므로 기다리던 전체 렌더링도 취소하고 세션 상태에서 뺀다 (표본 프레임 해제)
+        drop_refine_job()
+        st.info("그래프 종류를 선택해주세요 (또는 데이터를 업로드하세요).")
 
-        elif graph_type == "막대그래프":
-            # x = 이산형
-            if x_col != "사용안함" and not x_is_cont:
-                # (1) y_col = '개수' => geom_bar
-                if y_col == "개수":
-                    if group_col and group_col != "없음":
-                        plot = (
-                            ggplot(filtered_df, aes(x=x_col, fill=group_col))
-                            + geom_bar(position="dodge")
-                            + theme_minimal()
-                            + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                        )
-                    else:
-                        plot = (
-                            ggplot(filtered_df, aes(x=x_col))
-                            + geom_bar(fill="steelblue")
-                            + theme_minimal()
-                            + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                        )
-                else:
-                    # (2) y_col = 연속형 => geom_col
-                    if y_is_cont:
-                        # 합계 / 평균 선택 => groupby
-                        # group_col도 고려
-                        if agg_method in ["합계", "평균"]:
-                            if group_col and group_col != "없음":
-                                if agg_method == "합계":
-                                    aggregated_df = filtered_df.groupby([x_col, group_col], as_index=False)[y_col].sum()
-                                else:
-                                    aggregated_df = filtered_df.groupby([x_col, group_col], as_index=False)[y_col].mean()
-
-                                plot = (
-                                    ggplot(aggregated_df, aes(x=x_col, y=y_col, fill=group_col))
-                                    + geom_col(position="dodge")
-                                    + theme_minimal()
-                                    + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                                )
-                            else:
-                                # group이 없음
-                                if agg_method == "합계":
-                                    aggregated_df = filtered_df.groupby(x_col, as_index=False)[y_col].sum()
-                                else:
-                                    aggregated_df = filtered_df.groupby(x_col, as_index=False)[y_col].mean()
-
-                                plot = (
-                                    ggplot(aggregated_df, aes(x=x_col, y=y_col))
-                                    + geom_col(fill="steelblue")
-                                    + theme_minimal()
-                                    + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                                )
-                        else:
-                            # agg_method 미선택 => row별 그대로 geom_col
-                            if group_col and group_col != "없음":
-                                plot = (
-                                    ggplot(filtered_df, aes(x=x_col, y=y_col, fill=group_col))
-                                    + geom_col(position="dodge")
-                                    + theme_minimal()
-                                    + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                                )
-                            else:
-                                plot = (
-                                    ggplot(filtered_df, aes(x=x_col, y=y_col))
-                                    + geom_col(fill="steelblue")
-                                    + theme_minimal()
-                                    + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                                )
-                    else:
-                        st.error("막대그래프에서 Y축은 '개수' 또는 연속형 변수가 필요합니다.")
-            else:
-                st.error("막대그래프는 X축이 이산형이어야 합니다.")
+@st.fragment
+def filter_section(dataset_key, spec):
+    dataset = current_dataset(dataset_key)
+    if dataset is None:
+        drop_refine_job()
+        return
+    profile = dataset.profile
+
+    # --- 5) 이산형 필터 ---
+    discrete_filter_cols = []
+    for c in [spec.x_col, spec.y_col, spec.group_col, spec.color_col]:
+        if c and c != "개수" and (not column_is_continuous(profile, c)):
+            discrete_filter_cols.append(c)
+    discrete_filter_cols = list(dict.fromkeys(discrete_filter_cols))
+
+    selections = {}
+    for col_name in discrete_filter_cols:
+        unique_vals_str = profile[col_name].labels
+        selections[col_name] = st.multiselect(
+            f"'{col_name}' 필터 선택",
+            unique_vals_str,
+            default=unique_vals_str
+        )
 
-        elif graph_type == "상자그림":
-            # x 이산형, y 연속형
-            if x_col != "사용안함" and not x_is_cont and y_col not in ["사용안함", "개수"] and y_is_cont:
-                if group_col and group_col != "없음":
-                    plot = (
-                        ggplot(filtered_df, aes(x=x_col, y=y_col, fill=group_col))
-                        + geom_boxplot()
-                        + theme_minimal()
-                        + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                    )
-                else:
-                    plot = (
-                        ggplot(filtered_df, aes(x=x_col, y=y_col))
-                        + geom_boxplot()
-                        + theme_minimal()
-                        + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                    )
-            else:
-                st.error("상자그림은 X=이산형, Y=연속형 변수가 필요합니다.")
+    # 필터 선택까지 spec 에 넣어 (데이터셋 해시, spec 해시) 로 렌더링 결과를 캐시
+    chart_section(dataset_key, replace(spec, filters=filter_key(selections)), selections)
+    data_grid_section(dataset_key, selections)
+
+def filtered_frame(dataset, spec, selections) -> pd.DataFrame:
+    # 공유 데이터셋에서 그래프에 쓰는 컬럼만, 걸러진 행만 꺼낸다
+    with stage("filter", rows_in=len(dataset.df)) as record:
+        df = dataset.filters.apply(selections, spec_columns(spec))
+        record["rows_out"] = len(df)
+    return df
+
+@st.fragment
+def chart_section(dataset_key, spec, selections):
+    # 이 fragment 만 다시 실행될 때도 한 번의 실행으로 기록 (전체 실행 중이면 거기에 합쳐진다)
+    with trace("chart_section", graph_type=spec.graph_type) as running:
+        # 다른 그래프/필터로 바뀌었으면 이 세션이 기다리던 전체 렌더링은 여기서 취소된다
+        pending = take_refine_job((dataset_key, spec.key()))
+        dataset = current_dataset(dataset_key)
+        if dataset is not None:
+            show_chart(dataset, spec, selections, pending)
+            show_cache_status(dataset)
+            # 메모리 예산 사용량과 디스크 내리기/다시 올리기 횟수도 실행 기록에 남긴다
+            running["dataset_cache"] = dataset_cache.stats()
+        elif pending is not None:
+            pending.cancel()
+    fragment_dev_panel(running)
+
+def show_chart(dataset, spec, selections, pending=None):
+    backend = st.radio("그리기 방식", CHART_BACKENDS, horizontal=True)
+    try:
+        if backend == CHART_BACKENDS[1]:
+            if pending is not None:
+                pending.cancel()
+            # 확대/이동은 브라우저에서 처리되므로 다시 실행되지 않는다
+            df = filtered_frame(dataset, spec, selections)
+            with stage("figure", rows_in=len(df)):
+                fig = build_figure(df, spec, dataset.key)
+            with stage("display"):
+                st.plotly_chart(fig, width="stretch")
+        else:
+            show_image(dataset, spec, selections, pending)
+    except ChartError as e:
+        st.error(str(e))
+
+def take_refine_job(key):
+    # 이 세션이 기다리던 전체 렌더링. key(데이터셋, spec)가 다르면 지난 요청이므로 취소한다
+    job = st.session_state.pop("refine_job", None)
+    if job is not None and job.key != key:
+        job.cancel()
+        return None
+    return job
+
+def drop_refine_job():
+    # 그래프까지 가지 않는 경로(데이터 없음, 그래프 종류 선택안함)에서 부른다. key 가 None 인 작업은 없으므로 항상 취소
+    take_refine_job(None)
+
+def show_image(dataset, spec, selections, pending=None):
+    png = cached_chart(dataset.key, spec)
+    if png is None and pending is not None and pending.done():
+        # 캐시 예산보다 커서 캐시에 없는 결과, 또는 실패 (ChartError 는 show_chart 가 표시)
+        png = pending.result()
+    if png is None:
+        df = filtered_frame(dataset, spec, selections)
+        if PROGRESSIVE_RENDER and len(df) > PREVIEW_ROWS:
+            # 행이 많으면 층화 표본으로 먼저 그려 보여주고, 전체 렌더링은 백그라운드에서 돌린다
+            preview = preview_chart_png(dataset.key, spec, df)
+            job = pending or RefineJob(dataset.key, spec, df)
+            st.session_state["refine_job"] = job
+            with stage("display"):
+                refine_view(job, preview, len(df))
+            return
+        png = cached_chart_png(dataset.key, spec, lambda: df)
+    with stage("display"):
+        st.image(png, width="stretch")
+
+@st.fragment(run_every=REFINE_POLL_S)
+def refine_view(job, preview, n_rows):
+    # 전체 렌더링을 기다리는 동안 미리보기를 보여주고, 이 fragment 만 주기적으로 다시 실행해 완료를 확인한다.
+    # 스크립트를 막고 기다리지 않으므로 그 사이 다른 조작이 바로 처리되고, chart_section 이 지난 작업을 취소한다
+    if job.done():
+        # 전체 실행에서 chart_section 이 완성된 그래프를 그리고, 이 fragment 와 타이머는 정리된다
+        st.rerun()
+    st.image(
+        preview, width="stretch",
+        caption=f"미리보기 (표본 약 {PREVIEW_ROWS:,}행) · 전체 {n_rows:,}행으로 그리는 중...",
+    )
+
+def show_cache_status(dataset):
+    # 튜닝용 캐시 적중 현황
+    with st.expander("캐시 상태"):
+        st.write("데이터셋 캐시", dataset_cache.stats())
+        st.write("필터 마스크 캐시", dataset.filters.stats())
+        st.write("집계 캐시", aggregate_cache.stats())
+        st.write("차트 캐시", chart_cache.stats())
+        st.write("정렬 순서 캐시", order_cache.stats())
+        st.write("초기화 시간(ms)", startup_timings)
+        st.write("figure / 메모리", figure_stats())
+        st.write("렌더링 프로세스 풀", pool_stats())
+        st.write("진행형 렌더링", refine_stats())
+        running = current_trace()
+        if running is not None and running["stages"]:
+            st.write("이번 실행 단계별 측정")
+            st.dataframe(pd.DataFrame(running["stages"]), hide_index=True)
+
+@st.fragment
+def data_grid_section(dataset_key, selections):
+    # 필터된 데이터 보기. 정렬/페이지/컬럼 선택은 서버에서 하고 보이는 페이지만 보낸다
+    with trace("data_grid") as running:
+        dataset = current_dataset(dataset_key)
+        if dataset is not None:
+            with st.expander("데이터 보기 (필터 적용)"):
+                show_data_grid(dataset, selections)
+    fragment_dev_panel(running)
+
+def show_data_grid(dataset, selections):
+    all_columns = list(dataset.df.columns)
+    columns = st.multiselect("컬럼", all_columns, default=all_columns)
+    col_sort, col_order, col_size, col_page = st.columns([1.3, 1, 0.8, 0.8])
+    with col_sort:
+        sort_col = st.selectbox("정렬 기준", [NO_SORT] + all_columns)
+    with col_order:
+        ascending = st.radio("순서", ["오름차순", "내림차순"], horizontal=True) == "오름차순"
+    with col_size:
+        page_size = st.selectbox("페이지당 행 수", PAGE_SIZES, index=2)
+    with col_page:
+        page = st.number_input("페이지", min_value=1, value=1, step=1)
+    if not columns:
+        st.info("보여줄 컬럼을 선택해주세요.")
+        return
+    page_df, total_rows, page, n_pages = grid_page(
+        dataset, selections, columns,
+        sort_col=None if sort_col == NO_SORT else sort_col, ascending=ascending,
+        page=page - 1, page_size=page_size,
+    )
+    first = page * page_size
+    st.caption(
+        f"전체 {total_rows:,}행 중 {min(first + 1, total_rows):,}–{first + len(page_df):,}행 "
+        f"({page + 1}/{n_pages} 페이지)"
+    )
+    with stage("display", rows_in=len(page_df)):
+        st.dataframe(page_df)
+
+def dev_enabled() -> bool:
+    return DEV_PANEL or st.query_params.get("dev") == "1"
+
+def show_trace(finished):
+    st.caption(f"전체 {finished['total_ms']} ms · RSS {finished['rss_mb']} MB")
+    st.dataframe(pd.DataFrame(finished["stages"]), hide_index=True)
+
+def fragment_dev_panel(running):
+    # fragment 만 다시 실행됐을 때는 그 실행의 측정을 사이드바에 덧붙인다.
+    # (fragment 가 사이드바에 쓴 내용은 그 fragment 가 다시 실행될 때마다 새로 그려진다.
+    #  전체 실행 안에서 호출됐으면 실행이 아직 안 끝났으므로 dev_panel 이 보여준다)
+    if not dev_enabled() or last_trace() is not running:
+        return
+    with st.sidebar:
+        st.markdown(f"### 다시 실행된 구간: {running['trace']}")
+        show_trace(running)
+
+def dev_panel():
+    # 개발자용 사이드바: 방금 끝난 전체 실행의 단계별 시간, 행 수, 메모리 변화
+    if not dev_enabled():
+        return
+    finished = last_trace()
+    with st.sidebar:
+        st.markdown("### 단계별 측정 (전체 실행)")
+        if finished is not None:
+            show_trace(finished)
+        st.markdown("최근 실행 (프로세스 전체)")
+        st.dataframe(
+            pd.DataFrame([
+                {"at": t["at"], "trace": t["trace"], "total_ms": t["total_ms"], "rss_mb": t["rss_mb"]}
+                for t in reversed(recent_traces)
+            ]),
+            hide_index=True,
+        )
 
-        elif graph_type == "선그래프":
-            # (1) x_col != "사용안함" & x,y 모두 연속형 => 일반 라인
-            # (2) x_col == "사용안함" & y_col 연속형 => 인덱스 vs y_col
-            if x_col != "사용안함":
-                if x_is_cont and y_is_cont:
-                    if color_col and color_col != "없음":
-                        plot = (
-                            ggplot(filtered_df, aes(x=x_col, y=y_col, color=color_col, group=color_col))
-                            + geom_line()
-                            + theme_minimal()
-                            + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                        )
-                    else:
-                        plot = (
-                            ggplot(filtered_df, aes(x=x_col, y=y_col))
-                            + geom_line(color="steelblue")
-                            + theme_minimal()
-                            + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                        )
-                else:
-                    st.error("선그래프(일반)는 x,y 모두 연속형일 때 사용하세요.")
-            else:
-                if y_col not in ["사용안함", "개수"] and y_is_cont:
-                    tmp_df = filtered_df.reset_index(drop=False).rename(columns={"index": "IDX"})
-                    if color_col and color_col != "없음":
-                        plot = (
-                            ggplot(tmp_df, aes(x="IDX", y=y_col, color=color_col, group=color_col))
-                            + geom_line()
-                            + theme_minimal()
-                            + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                        )
-                    else:
-                        plot = (
-                            ggplot(tmp_df, aes(x="IDX", y=y_col))
-                            + geom_line(color="steelblue")
-                            + theme_minimal()
-                            + theme(figure_size=(10, 6),text=element_text(family='NanumGothic', size=20))
-                        )
-                else:
-                    st.error("선그래프: x='사용안함'일 때는 Y축이 연속형 변수여야 합니다. (인덱스 vs y_col)")
-
-        if plot is not None:
-            fig = plot.draw()
-            st.pyplot(fig)
+def main():
+    # matplotlib/plotnine 은 첫 화면을 띄운 뒤 백그라운드에서 한 번만 초기화
+    warm_up_in_background()
+
+    st.title("간단한 시각화 App (ggplot 방식)")
+
+    # --- 1) 데이터 업로드 ---
+    # 업로드/미리보기는 앱 전체 실행에서만 돈다. 아래 구간들은 각각 fragment 라서
+    # 축/옵션/필터를 바꾸면 바뀐 구간부터 아래쪽만 다시 실행된다.
+    uploaded_file = st.file_uploader(
+        "데이터 파일을 업로드하세요 (엑셀, CSV, Parquet, Feather/Arrow)", type=SUPPORTED_TYPES
+    )
+    server_path = None
+    if uploaded_file is None and DATA_DIR:
+        # 서버에 있는 파일(데이터 웨어하우스 내보내기 등)은 업로드 없이 바로 연다
+        server_file = st.selectbox("또는 서버 데이터 파일", ["선택안함"] + list_data_files())
+        if server_file != "선택안함":
+            server_path = os.path.join(DATA_DIR, server_file)
+
+    sheet_name = None
+    if uploaded_file is not None and is_excel(uploaded_file.name):
+        sheet_name = select_sheet(uploaded_file.getvalue())
+    elif server_path is not None and is_excel(server_path):
+        sheet_name = select_sheet(server_path)
+    dataset = load_data(uploaded_file, sheet_name, server_path)
+
+    if dataset is not None:
+        st.success("데이터 업로드 성공!")
+        if dataset.memory_report:
+            report = dataset.memory_report
+            st.caption(f"메모리 {report['before_mb']} MB → {report['after_mb']} MB (dtype 축소)")
+        st.write("미리보기:")
+        st.dataframe(dataset.df.head())
     else:
-        st.info("그래프 종류를 선택해주세요 (또는 데이터를 업로드하세요).")
+        st.info("데이터 파일을 업로드해주세요.")
+
+    st.markdown("---")
+
+    axis_section(dataset.key if dataset is not None else None)
 
 if __name__ == "__main__":
-    main()
+    with trace("app"):
+        main()
+    dev_panel()
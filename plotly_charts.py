@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from chart_data import box_summary_table, density_table, histogram_table
+from charts import (
+    AGG_METHODS, COUNT, SCATTER_DENSITY_ROWS, PlotSpec, bar_table, check_spec, line_table
+)
+
+# 같은 PlotSpec 을 plotly Figure 로 만든다. 산점도/선그래프는 WebGL(Scattergl) 트레이스라서
+# 확대/이동은 브라우저에서 처리되고 서버는 다시 실행되지 않는다.
+# 브라우저로 보내는 데이터 양은 plotnine 쪽과 같은 한도(구간 집계, 선 축소, 요약 테이블)로 줄인다.
+
+
+def _color(i: int) -> str:
+    from plotly.colors import qualitative
+    return qualitative.Plotly[i % len(qualitative.Plotly)]
+
+
+def _split(df: pd.DataFrame, col):
+    # (라벨, 부분 테이블) 목록. 그룹 변수가 없으면 전체 하나
+    if col is None:
+        return [(None, df)]
+    return list(df.groupby(col, observed=True, sort=True))
+
+
+def _layout(fig, spec: PlotSpec, x_title, y_title):
+    fig.update_layout(
+        height=600,
+        margin=dict(l=40, r=20, t=30, b=40),
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        legend_title_text=spec.group_col or spec.color_col or "",
+    )
+    return fig
+
+
+def _histogram(df, spec):
+    import plotly.graph_objects as go
+
+    # 컬럼 이름과 관계없이 구간 집계 (히스토그램 테이블의 'count' 컬럼과 겹치지 않게)
+    src = pd.DataFrame({"x": df[spec.x_col]})
+    if spec.group_col:
+        src["g"] = df[spec.group_col]
+    table, bin_width = histogram_table(src, "x", spec.bins or 30, "g" if spec.group_col else None)
+
+    fig = go.Figure()
+    if table is not None:
+        for i, (label, part) in enumerate(_split(table, "g" if spec.group_col else None)):
+            fig.add_trace(go.Bar(
+                x=part["x"], y=part["count"], width=bin_width,
+                name=None if label is None else str(label),
+                marker=dict(color="steelblue" if label is None else _color(i),
+                            line=dict(color="white", width=1)),
+                opacity=0.5 if label is not None else 1.0,
+            ))
+    fig.update_layout(barmode="overlay", showlegend=bool(spec.group_col))
+    return _layout(fig, spec, spec.x_col, "count")
+
+
+def _scatter(df, spec):
+    import plotly.graph_objects as go
+
+    x_col, y_col, color_col = spec.x_col, spec.y_col, spec.color_col
+    fig = go.Figure()
+    if len(df) > SCATTER_DENSITY_ROWS:
+        # 대용량 모드: 점 대신 2D 구간(최대 160x96 칸)만 보낸다
+        src = pd.DataFrame({"x": df[x_col], "y": df[y_col]})
+        if color_col:
+            src["c"] = df[color_col]
+        cells, _ = density_table(src, "x", "y", "c" if color_col else None)
+        if cells is not None:
+            if color_col:
+                for i, (label, part) in enumerate(_split(cells, "c")):
+                    fig.add_trace(go.Scattergl(
+                        x=part["x"], y=part["y"], mode="markers", name=str(label),
+                        marker=dict(symbol="square", size=5, color=_color(i), opacity=0.8),
+                    ))
+            else:
+                fig.add_trace(go.Scattergl(
+                    x=cells["x"], y=cells["y"], mode="markers",
+                    customdata=cells["count"], hovertemplate="%{x}, %{y}<br>count=%{customdata}",
+                    marker=dict(symbol="square", size=5, color=np.log10(cells["count"]),
+                                colorscale="Blues", colorbar=dict(title="log10(count)")),
+                ))
+        return _layout(fig, spec, x_col, y_col)
+
+    for i, (label, part) in enumerate(_split(df, color_col)):
+        fig.add_trace(go.Scattergl(
+            x=part[x_col], y=part[y_col], mode="markers",
+            name=None if label is None else str(label),
+            marker=dict(color="steelblue" if label is None else _color(i), size=5),
+        ))
+    fig.update_layout(showlegend=bool(color_col))
+    return _layout(fig, spec, x_col, y_col)
+
+
+def _bar(df, spec, dataset_key):
+    import plotly.graph_objects as go
+
+    x_col, y_col, group_col = spec.x_col, spec.y_col, spec.group_col
+    keys = [x_col, group_col] if group_col else [x_col]
+    if y_col == COUNT:
+        table = df.groupby(keys, observed=True, sort=True).size().rename("count").reset_index()
+        value_col, y_title = "count", "count"
+    else:
+        # 집계 방식이 없으면 plotnine 의 geom_col 처럼 행을 쌓은 높이(합계)를 보낸다
+        table = bar_table(df, spec, AGG_METHODS.get(spec.agg_method, "sum"), dataset_key)
+        value_col, y_title = y_col, y_col
+
+    fig = go.Figure()
+    for i, (label, part) in enumerate(_split(table, group_col)):
+        fig.add_trace(go.Bar(
+            x=part[x_col].astype(str), y=part[value_col],
+            name=None if label is None else str(label),
+            marker_color="steelblue" if label is None else _color(i),
+        ))
+    fig.update_layout(barmode="group", showlegend=bool(group_col))
+    return _layout(fig, spec, x_col, y_title)
+
+
+def _box(df, spec):
+    import plotly.graph_objects as go
+
+    x_col, y_col, group_col = spec.x_col, spec.y_col, spec.group_col
+    fig = go.Figure()
+    summary = box_summary_table(df, x_col, y_col, group_col)
+    if summary is not None:
+        for i, (label, part) in enumerate(_split(summary, group_col)):
+            name = y_col if label is None else str(label)
+            color = (spec.box_fill or _color(0)) if label is None else _color(i)
+            x = part[x_col].astype(str)
+            # 요약 통계만 넘기고 상자는 브라우저에서 그린다
+            fig.add_trace(go.Box(
+                x=x, q1=part["lower"], median=part["middle"], q3=part["upper"],
+                lowerfence=part["ymin"], upperfence=part["ymax"],
+                name=name, offsetgroup=name, marker_color=color, boxpoints=False,
+            ))
+            counts = part["outliers"].map(len).to_numpy()
+            if counts.sum():
+                fig.add_trace(go.Scatter(
+                    x=np.repeat(x.to_numpy(), counts),
+                    y=np.concatenate(part["outliers"].to_list()),
+                    mode="markers", name=name, offsetgroup=name,
+                    marker_color=color, showlegend=False,
+                ))
+    fig.update_layout(boxmode="group", scattermode="group", showlegend=bool(group_col))
+    return _layout(fig, spec, x_col, y_col)
+
+
+def _line(df, spec):
+    import plotly.graph_objects as go
+
+    y_col, color_col = spec.y_col, spec.color_col
+    line_df, line_x = line_table(df, spec)
+    fig = go.Figure()
+    for i, (label, part) in enumerate(_split(line_df, color_col)):
+        # geom_line 과 같이 x 순서로 잇는다
+        part = part.sort_values(line_x, kind="stable")
+        fig.add_trace(go.Scattergl(
+            x=part[line_x], y=part[y_col], mode="lines",
+            name=None if label is None else str(label),
+            line=dict(color="steelblue" if label is None else _color(i)),
+        ))
+    fig.update_layout(showlegend=bool(color_col))
+    return _layout(fig, spec, line_x, y_col)
+
+
+def build_figure(df: pd.DataFrame, spec: PlotSpec, dataset_key: str = None):
+    # build_plot 과 같은 검사/집계를 거쳐 plotly Figure 를 만든다
+    check_spec(df, spec)
+    if spec.graph_type == "히스토그램":
+        return _histogram(df, spec)
+    if spec.graph_type == "산점도":
+        return _scatter(df, spec)
+    if spec.graph_type == "막대그래프":
+        return _bar(df, spec, dataset_key)
+    if spec.graph_type == "상자그림":
+        return _box(df, spec)
+    return _line(df, spec)
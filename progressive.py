@@ -0,0 +1,76 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from charts import cached_chart_png
+
+# 진행형 렌더링: 표본 미리보기를 먼저 보여주고, 전체 렌더링은 백그라운드 스레드에서 돌린다.
+# 화면 쪽은 스크립트를 막지 않고 작업을 세션 상태에 두었다가, 그래프/필터/그리기 방식이 바뀌면 cancel() 한다.
+# 대기열에 있던 작업은 시작하지 않고, 진행 중인 작업은 다음 확인 지점에서 멈춘다
+# (인라인: 시작할 때와 집계 후 그리기 전, 프로세스 풀: 자리/결과를 기다리는 동안).
+# 환경변수 PROGRESSIVE_RENDER=0 이면 끈다
+PROGRESSIVE_RENDER = os.environ.get("PROGRESSIVE_RENDER", "1") == "1"
+REFINE_WORKERS = int(os.environ.get("REFINE_WORKERS", str(os.cpu_count() or 1)))
+# 화면에서 완료 여부를 확인하는 간격 (초)
+REFINE_POLL_S = 0.5
+
+_executor = None
+_lock = threading.Lock()
+_counters = {"submitted": 0, "completed": 0, "cancelled": 0}
+
+
+class RefineCancelled(Exception):
+    """더 새로운 요청이 있어 중단된 전체 렌더링."""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REFINE_WORKERS, thread_name_prefix="refine")
+        return _executor
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+class RefineJob:
+    """백그라운드에서 도는 전체 해상도 렌더링 하나."""
+
+    def __init__(self, dataset_key: str, spec, df):
+        # (데이터셋 해시, spec 해시). 화면이 같은 그래프를 기다리는지 비교하는 데 쓴다
+        self.key = (dataset_key, spec.key())
+        self._cancelled = threading.Event()
+        _count("submitted")
+        self.future = _get_executor().submit(self._run, dataset_key, spec, df)
+
+    def _check(self) -> None:
+        if self._cancelled.is_set():
+            raise RefineCancelled()
+
+    def _run(self, dataset_key, spec, df) -> bytes:
+        # 대기열에서 기다리다 시작할 때 이미 지난 요청이면 그리지 않는다
+        self._check()
+        png = cached_chart_png(dataset_key, spec, lambda: df, check=self._check)
+        _count("completed")
+        return png
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self) -> bytes:
+        return self.future.result()
+
+    def cancel(self) -> None:
+        if self.future.done():
+            return
+        self._cancelled.set()
+        self.future.cancel()
+        _count("cancelled")
+
+
+def refine_stats() -> dict:
+    with _lock:
+        return dict(_counters, workers=REFINE_WORKERS)
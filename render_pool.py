@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# 선택 사항: 그래프 렌더링을 별도 프로세스 풀에서 한다.
+# 스크립트 스레드에서 그리면 동시 사용자가 많을 때 GIL 과 matplotlib 전역 상태를 두고 경합하므로,
+# spec 과 필요한 컬럼만 담은 Arrow IPC 바이트를 워커에 보내고 PNG 바이트만 돌려받는다.
+# 환경변수 RENDER_BACKEND=process 로 켠다 (기본값 inline: 지금처럼 같은 프로세스에서 렌더링).
+
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "inline")
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(os.cpu_count() or 2)))
+# 요청 하나의 최대 렌더링 시간(초)
+RENDER_TIMEOUT_S = float(os.environ.get("RENDER_TIMEOUT_S", "30"))
+# 동시에 맡길 수 있는 요청 수. 넘으면 자리가 날 때까지 기다리고, 그래도 안 나면 거절한다
+RENDER_MAX_PENDING = int(os.environ.get("RENDER_MAX_PENDING", str(RENDER_WORKERS * 2)))
+
+_lock = threading.Lock()
+_pool = None
+_slots = threading.BoundedSemaphore(RENDER_MAX_PENDING)
+_counters = {
+    "submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0, "rejected": 0, "restarts": 0,
+}
+# 취소 확인 콜백(check)이 있을 때 기다리는 중간중간 확인하는 간격 (초)
+CHECK_INTERVAL_S = 0.1
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def enabled() -> bool:
+    return RENDER_BACKEND == "process"
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+# --- 워커 프로세스 쪽 ---
+
+def _init_worker():
+    # 워커마다 폰트/테마를 한 번만 초기화
+    from app_init import chart_theme
+    chart_theme()
+
+
+def _on_alarm(signum, frame):
+    raise RenderTimeout()
+
+
+def _render_in_worker(payload: bytes, spec, timeout_s: float) -> bytes:
+    import pyarrow as pa
+
+    from charts import ChartError, build_plot
+    from renderer import render_png
+
+    # 오래 걸리는 그리기는 워커 안에서 끊어서 다음 요청이 밀리지 않게 한다 (유닉스만)
+    has_alarm = hasattr(signal, "setitimer")
+    if has_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout_s)
+    try:
+        df = pa.ipc.open_stream(payload).read_all().to_pandas()
+        return render_png(build_plot(df, spec))
+    except RenderTimeout:
+        raise ChartError("그래프 렌더링 시간이 초과되었습니다.") from None
+    finally:
+        if has_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# --- 스크립트(메인 프로세스) 쪽 ---
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # 스트림릿 서버는 스레드를 여러 개 쓰므로 fork 대신 spawn 으로 깨끗한 프로세스를 띄운다
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool(broken):
+    global _pool
+    with _lock:
+        if _pool is broken:
+            _pool = None
+            _counters["restarts"] += 1
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def encode_frame(df, columns) -> bytes:
+    # 그래프에 쓰는 컬럼만 Arrow IPC 스트림으로 직렬화 (인덱스 포함: 선그래프의 인덱스 축에 쓰인다)
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df[list(columns)], preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _wait(acquire_or_result, timeout: float, check=None):
+    # acquire_or_result(timeout) 을 부른다. check 가 있으면 짧게 나눠 기다리면서 취소를 확인한다
+    if check is None:
+        return acquire_or_result(timeout)
+    deadline = time.monotonic() + timeout
+    while True:
+        check()
+        remaining = deadline - time.monotonic()
+        try:
+            return acquire_or_result(max(min(remaining, CHECK_INTERVAL_S), 0))
+        except FutureTimeout:
+            if remaining <= CHECK_INTERVAL_S:
+                raise
+
+
+def _acquire_slot(timeout: float) -> bool:
+    # 세마포어는 시간 초과 때 False 를 돌려주므로 future 처럼 예외로 바꿔 _wait 에 맞춘다
+    if not _slots.acquire(timeout=timeout):
+        raise FutureTimeout()
+    return True
+
+
+def render(df, spec, columns, check=None) -> bytes:
+    # check: 취소 확인 콜백 (취소됐으면 예외를 던진다). 자리 대기, 인코딩 후, 결과 대기 중에 확인한다.
+    # 대기열에 있던 작업은 빠지고, 이미 워커에서 돌고 있으면 결과만 버린다 (워커는 타이머로 끝난다)
+    from charts import ChartError
+
+    try:
+        _wait(_acquire_slot, RENDER_TIMEOUT_S, check)
+    except FutureTimeout:
+        _count("rejected")
+        raise ChartError("렌더링 요청이 많아 잠시 후 다시 시도해주세요.") from None
+    try:
+        pool = _get_pool()
+        payload = encode_frame(df, columns)
+        if check is not None:
+            check()
+        _count("submitted")
+        try:
+            future = pool.submit(_render_in_worker, payload, spec, RENDER_TIMEOUT_S)
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            pool = _get_pool()
+            future = pool.submit(_render_in_worker, payload, spec, RENDER_TIMEOUT_S)
+        try:
+            # 워커 안의 타이머가 먼저 끊으므로 여기는 대기열 시간까지 여유를 둔다
+            png = _wait(future.result, RENDER_TIMEOUT_S * 2, check)
+        except FutureTimeout:
+            future.cancel()
+            _count("timeouts")
+            raise ChartError("그래프 렌더링 시간이 초과되었습니다.") from None
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            _count("failed")
+            raise ChartError("렌더링 프로세스가 비정상 종료되었습니다. 다시 시도해주세요.") from None
+        except Exception:
+            if future.cancel() or not future.done():
+                # 작업이 실패한 게 아니라 check() 가 취소를 알렸다
+                _count("cancelled")
+            else:
+                _count("failed")
+            raise
+        _count("completed")
+        return png
+    finally:
+        _slots.release()
+
+
+def pool_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    stats["backend"] = RENDER_BACKEND
+    stats["workers"] = RENDER_WORKERS if enabled() else 0
+    stats["in_flight"] = (
+        stats["submitted"] - stats["completed"] - stats["failed"] - stats["timeouts"] - stats["cancelled"]
+    )
+    return stats
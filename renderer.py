@@ -0,0 +1,77 @@
+import io
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from app_init import chart_theme
+from metrics import rss_bytes, stage
+
+# PNG 해상도. st.pyplot 기본값(200)과 같게 두고 환경변수 RENDER_DPI 로 조정
+RENDER_DPI = int(os.environ.get("RENDER_DPI", "200"))
+
+# figure 는 렌더링 계층만 만들고 닫는다. 닫힌 뒤에도 살아 있는 figure 를 찾기 위해 약한 참조로 추적
+_live_figures = weakref.WeakSet()
+_lock = threading.Lock()
+_counters = {"rendered": 0, "failed": 0, "bytes_out": 0, "render_ms": 0.0}
+
+
+@contextmanager
+def managed_figure(plot):
+    # plot.draw() 로 figure 를 만들고, 블록이 끝나면 (예외가 나도) 바로 정리한다
+    chart_theme()
+    import matplotlib.pyplot as plt
+
+    with stage("draw"):
+        fig = plot.draw()
+    _live_figures.add(fig)
+    try:
+        yield fig
+    finally:
+        fig.clear()
+        # 예전 plotnine 처럼 pyplot 레지스트리에 등록된 경우까지 닫는다
+        plt.close(fig)
+
+
+def render_bytes(plot, fmt: str = "png", dpi: int = None) -> bytes:
+    start = time.perf_counter()
+    try:
+        with managed_figure(plot) as fig, stage("encode") as record:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=fmt, dpi=dpi or RENDER_DPI, bbox_inches="tight")
+            record["bytes_out"] = buffer.tell()
+    except Exception:
+        with _lock:
+            _counters["failed"] += 1
+        raise
+    data = buffer.getvalue()
+    with _lock:
+        _counters["rendered"] += 1
+        _counters["bytes_out"] += len(data)
+        _counters["render_ms"] += (time.perf_counter() - start) * 1000
+    return data
+
+
+def render_png(plot, dpi: int = None) -> bytes:
+    return render_bytes(plot, "png", dpi)
+
+
+def figure_stats() -> dict:
+    pyplot_figures = 0
+    if "matplotlib.pyplot" in sys.modules:
+        pyplot_figures = len(sys.modules["matplotlib.pyplot"].get_fignums())
+    with _lock:
+        counters = dict(_counters)
+    rendered = counters["rendered"]
+    rss = rss_bytes()
+    return {
+        "live_figures": len(_live_figures),
+        "pyplot_figures": pyplot_figures,
+        "rendered": rendered,
+        "failed": counters["failed"],
+        "avg_render_ms": round(counters["render_ms"] / rendered, 1) if rendered else None,
+        "bytes_out": counters["bytes_out"],
+        "rss_mb": round(rss / 1024 / 1024, 1) if rss is not None else None,
+    }
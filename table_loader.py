@@ -0,0 +1,118 @@
+import os
+
+import pandas as pd
+
+from excel_loader import NA_STRINGS, read_sheet
+
+# 확장자 -> 형식. 엑셀 외에는 pyarrow 로 읽고 pandas 로 한 번만 변환한다
+FORMATS = {
+    "xlsx": "excel",
+    "xls": "excel",
+    "csv": "csv",
+    "parquet": "parquet",
+    "feather": "arrow",
+    "arrow": "arrow",
+    "ipc": "arrow",
+}
+SUPPORTED_TYPES = list(FORMATS)
+
+# 서버에 있는 데이터 파일 폴더 (데이터 웨어하우스 내보내기 등). 설정하면 업로드 없이 골라서 연다
+DATA_DIR = os.environ.get("DATA_DIR")
+
+# CSV 를 스트리밍으로 읽을 때 한 번에 파싱하는 바이트 수
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def file_format(name: str) -> str:
+    ext = os.path.splitext(str(name))[1].lower().lstrip(".")
+    if ext not in FORMATS:
+        raise ValueError(f"지원하지 않는 파일 형식입니다: .{ext}")
+    return FORMATS[ext]
+
+
+def is_excel(name: str) -> bool:
+    return file_format(name) == "excel"
+
+
+def list_data_files(data_dir: str = None) -> list:
+    data_dir = data_dir or DATA_DIR
+    if not data_dir or not os.path.isdir(data_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(data_dir)
+        if os.path.splitext(name)[1].lower().lstrip(".") in FORMATS
+        and os.path.isfile(os.path.join(data_dir, name))
+    )
+
+
+def _input(source, memory_map: bool = False):
+    # bytes 는 복사 없이 Arrow 버퍼로 감싸고, 경로는 필요하면 메모리 매핑한다
+    import pyarrow as pa
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pa.BufferReader(pa.py_buffer(source))
+    if memory_map:
+        return pa.memory_map(str(source), "r")
+    return pa.OSFile(str(source), "r")
+
+
+def _to_pandas(table) -> pd.DataFrame:
+    # split_blocks: 컬럼을 2차원 블록으로 합치지 않아 변환 중 복사가 줄고,
+    # 결측치 없는 숫자 컬럼은 (메모리 매핑한 경우) 파일 버퍼를 그대로 가리킨다
+    return table.to_pandas(split_blocks=True)
+
+
+def _read_csv(source, progress=None) -> pd.DataFrame:
+    import pyarrow as pa
+    from pyarrow import csv
+
+    total = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+    stream = _input(source)
+    reader = csv.open_csv(
+        stream,
+        read_options=csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        # pd.read_csv/read_excel 과 같은 결측치 규칙 (문자열 컬럼의 'NA', 빈 칸 포함)
+        convert_options=csv.ConvertOptions(null_values=NA_STRINGS, strings_can_be_null=True),
+    )
+    batches = []
+    for batch in reader:
+        batches.append(batch)
+        if progress is not None and total:
+            progress(min(stream.tell() / total, 1.0))
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    del batches
+    return _to_pandas(table)
+
+
+def _read_parquet(source) -> pd.DataFrame:
+    from pyarrow import parquet
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return _to_pandas(parquet.read_table(_input(source)))
+    return _to_pandas(parquet.read_table(str(source), memory_map=True))
+
+
+def _read_arrow(source) -> pd.DataFrame:
+    from pyarrow import feather
+
+    # Feather(v1/v2) 와 Arrow IPC 파일 모두 처리. 경로면 메모리 매핑해서 통째로 복사하지 않는다
+    return _to_pandas(feather.read_table(_input(source, memory_map=True)))
+
+
+def read_table(source, name: str, sheet_name=None, progress=None) -> pd.DataFrame:
+    # source: 업로드 바이트 또는 서버 파일 경로. name 의 확장자로 형식을 정한다
+    fmt = file_format(name)
+    if fmt == "excel":
+        if not isinstance(source, (bytes, bytearray)):
+            with open(source, "rb") as f:
+                source = f.read()
+        return read_sheet(source, sheet_name, progress=progress)
+    if fmt == "csv":
+        return _read_csv(source, progress)
+    if fmt == "parquet":
+        df = _read_parquet(source)
+    else:
+        df = _read_arrow(source)
+    if progress is not None:
+        progress(1.0)
+    return df
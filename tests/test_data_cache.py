@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_cache import Dataset, DatasetCache, SpilledDataset  # noqa: E402
+
+
+def _dataset(key, df) -> Dataset:
+    return Dataset(key=key, df=df)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DatasetCache(10 ** 9, idle_seconds=0, spill_dir=str(tmp_path))
+
+
+def test_spill_and_reload_parquet(cache):
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    cache.put("k", _dataset("k", df))
+    cache.acquire("k", "owner")
+
+    assert cache.spill("k")
+    assert isinstance(cache._entries["k"][0], SpilledDataset)
+    assert cache._spill_files["k"].endswith(".parquet")
+
+    reloaded = cache.get("k")
+    pd.testing.assert_frame_equal(reloaded.df, df)
+
+
+def test_spill_and_reload_mixed_type_column(cache):
+    # 숫자와 문자가 섞인 object 컬럼은 Arrow 로 바꿀 수 없어 pickle 로 내린다
+    df = pd.DataFrame({"mixed": pd.Series([1, "two", 3.0, None], dtype=object), "n": [1, 2, 3, 4]})
+    cache.put("k", _dataset("k", df))
+    cache.acquire("k", "owner")
+
+    assert cache.spill("k")
+    path = cache._spill_files["k"]
+    assert path.endswith(".pkl")
+    assert not [name for name in os.listdir(cache.spill_dir) if name.endswith(".tmp")]
+
+    reloaded = cache.get("k")
+    assert isinstance(reloaded, Dataset)
+    pd.testing.assert_frame_equal(reloaded.df, df)
+    assert cache.stats()["reloads"] == 1
+
+
+def test_over_budget_skips_unspillable(cache, monkeypatch):
+    # 내리지 못한 데이터셋은 건너뛰고 다음 후보를 내린다
+    frames = {key: pd.DataFrame({"v": range(1000)}) for key in ("a", "b", "c")}
+    for key, df in frames.items():
+        cache.put(key, _dataset(key, df))
+        cache.acquire(key, key)
+
+    write_spill = cache._write_spill
+    monkeypatch.setattr(cache, "_write_spill", lambda key, df: None if key == "a" else write_spill(key, df))
+    cache.memory_budget_bytes = cache._entries["c"][1]
+    cache._spill_over_budget()
+
+    assert isinstance(cache._entries["a"][0], Dataset)
+    assert "a" in cache._unspillable
+    assert isinstance(cache._entries["b"][0], SpilledDataset)
+    assert isinstance(cache._entries["c"][0], Dataset)